@@ -0,0 +1,68 @@
+"""Per-path concurrency limits with fast load shedding"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class Overloaded(Exception):
+    """A request was shed; `status_code` is 429 (queue full) or 503 (waited too long)"""
+
+    def __init__(self, path, status_code, retry_after):
+        super().__init__(f"Too many {path} predictions in progress, retry in {retry_after:g}s")
+        self.path = path
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionLimiter:
+    """Lets `max_concurrent` requests run on one path and up to `max_queued` wait for a slot
+
+    A request arriving to a full queue is rejected at once with a 429, and one
+    that waited `max_wait` seconds without getting a slot is rejected with a
+    503, both carrying `retry_after` seconds as a hint, instead of holding a
+    connection until the server times out.
+    """
+
+    def __init__(self, path, max_concurrent, max_queued, max_wait, retry_after):
+        self.path = path
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.max_wait = max_wait
+        self.retry_after = retry_after
+        self.active = 0
+        self.queued = 0
+        self._slots = None
+
+    def check(self):
+        """Reject right away if a new request would find the queue full
+
+        For streamed responses, so the 429 goes out before the headers do.
+        """
+        if self._slots is not None and self._slots.locked() and self.queued >= self.max_queued:
+            raise Overloaded(self.path, 429, self.retry_after)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one of the path's slots for the duration of the block"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+
+        if self._slots.locked():
+            if self.queued >= self.max_queued:
+                raise Overloaded(self.path, 429, self.retry_after)
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.max_wait)
+            except asyncio.TimeoutError:
+                raise Overloaded(self.path, 503, self.retry_after)
+            finally:
+                self.queued -= 1
+        else:
+            await self._slots.acquire()
+
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._slots.release()
@@ -1,32 +1,52 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 from typing import List, Dict, Union, Optional
-import pandas as pd
 import numpy as np
-import joblib
 import os
 import json
 import uuid
+import time
 import asyncio
-from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import accuracy_score
-
-# Try to import plotly with a fallback
-try:
-    import plotly
-    PLOTLY_AVAILABLE = True
-except ImportError:
-    PLOTLY_AVAILABLE = False
-    print("Plotly import failed, interactive plots will not be available")
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from admission import AdmissionLimiter, Overloaded
+from columnar_io import (
+    ARROW_MEDIA_TYPE, NPY_MEDIA_TYPE, UnsupportedFormatError,
+    read_arrow_matrix, read_npy_matrix, validate_features, write_arrow, write_npy
+)
+from config import BATCH_SIZE, DIM, FEATURE_COLUMNS
+from fixed_point import check_compiled_fixed_point, decode_probability
+from fused_kernel import FusedKernel
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, Counter, Histogram, render as render_metrics
+from model_registry import ModelRegistry, atomic_write_json
+from training_cache import TRAINING_CACHE_DIR, TrainingResultCache
+from training_jobs import COMPLETED, FAILED, QUEUED, TRAINING, UPLOADING, TrainingJobStore
+from nillion_pool import NillionClientPool, ProviderInfoCache
+from prediction_cache import PredictionCache
+from secure_batcher import MicroBatcher
+from upload_store import UploadStore
+from nillion_store import (
+    TtlRenewalScheduler, hash_model_secrets, hash_programs,
+    is_expiring, read_provider_variables
+)
+
+# pandas, sklearn's training modules and the Nillion libraries are imported
+# where they are used, so serving-only workers start without them
+
+_nillion_imports = None
 
 # Lazy import for Nillion libraries to reduce memory usage
 def get_nillion_imports():
+    global _nillion_imports
+    if _nillion_imports is None:
+        _nillion_imports = _import_nillion()
+    return _nillion_imports
+
+def _import_nillion():
     import nada_numpy as na
     import nada_numpy.client as na_client
     from dotenv import load_dotenv
@@ -37,6 +57,9 @@ def get_nillion_imports():
     )
     from nillion_client.ids import UserId
     from nada_ai.client import SklearnClient
+    if NILLION_NETWORK == "local":
+        # In-process stand-in with the same call pattern, for load testing offline
+        from nillion_local import LocalNetwork as Network, LocalVmClient as VmClient
     
     return na, na_client, load_dotenv, InputPartyBinding, Network, NilChainPayer, \
            NilChainPrivateKey, OutputPartyBinding, Permissions, PrivateKey, \
@@ -48,9 +71,104 @@ os.makedirs("model", exist_ok=True)
 os.makedirs("target", exist_ok=True)
 
 # Constants
+# Memory-mapped model bundle read by every worker and script
+ARTIFACT_PATH = "model/diabetes_model.bin"
+# Pickled model and scaler of older releases, converted to the bundle on first load
 MODEL_PATH = "model/diabetes_classifier.joblib"
 SCALER_PATH = "model/diabetes_scaler.joblib"
 PROVIDER_INFO_PATH = "model/provider_info.json"
+# "testnet" or "local" (the in-process stand-in in nillion_local.py, configured by NILLION_LOCAL_*)
+NILLION_NETWORK = os.getenv("NILLION_NETWORK", "testnet")
+# Lifetime of the model secrets stored on Nillion and how long before expiry they are renewed
+MODEL_TTL_DAYS = int(os.getenv("NILLION_MODEL_TTL_DAYS", "1"))
+MODEL_TTL_RENEW_MARGIN = float(os.getenv("NILLION_TTL_RENEW_MARGIN_SECONDS", str(6 * 3600)))
+# Window for coalescing concurrent secure /predict requests into one computation (0 disables it)
+SECURE_BATCH_WINDOW = float(os.getenv("SECURE_BATCH_WINDOW_MS", "20")) / 1000
+# Load the model at import time. Opening Nillion sessions at startup (retrying until they
+# are up) is opt-in, since /ready then waits for them and local scoring does not need them
+MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "true").lower() == "true"
+NILLION_POOL_WARMUP = os.getenv("NILLION_POOL_WARMUP", "false").lower() == "true"
+NILLION_WARMUP_RETRY_SECONDS = 30
+# How often a worker checks whether another worker published a new model artifact
+MODEL_REFRESH_SECONDS = float(os.getenv("MODEL_REFRESH_SECONDS", "1"))
+# Opt-in cache of /predict results for repeated patient vectors (0 entries disables it)
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "0"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", "300"))
+MODEL_PROVIDER_NAME = "Provider"
+PATIENT_NAME = "Patient"
+BATCH_PROGRAM_NAME = "diabetes_prediction_batch"
+# Signing keys identifying each party of the Nada program on the network
+PARTY_SIGNING_KEYS = {
+    MODEL_PROVIDER_NAME: b'\xbf\xdf7\xa9\x1eL\x10i"\xd8\x1f\xbb\xe8\r;\x1b`\x1a\xd1\xa1;\xef\xd8\xbbf|\xf9\x12\xe9\xef\x03\xc7',
+    PATIENT_NAME: b"\x15\xa0\xc1\xcc\x12\xb5r\xf9\xcb\x89\x95\x8d\x94\xfb\xfe)\xdf\xfe\xbd3\x00\x18\x80\xc1\xd9W\x8b\xf7\xc0\x92S\xe9",
+}
+# Concurrent predictions per path, how many more may wait for a slot (and for how long) before
+# being shed with a 429/503, and the Retry-After hint sent with it
+LOCAL_MAX_CONCURRENT = int(os.getenv("LOCAL_MAX_CONCURRENT", "64"))
+LOCAL_MAX_QUEUED = int(os.getenv("LOCAL_MAX_QUEUED", "256"))
+SECURE_MAX_CONCURRENT = int(os.getenv("SECURE_MAX_CONCURRENT", "16"))
+SECURE_MAX_QUEUED = int(os.getenv("SECURE_MAX_QUEUED", "32"))
+ADMISSION_MAX_WAIT = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "10"))
+LOCAL_RETRY_AFTER = 1
+SECURE_RETRY_AFTER = 10
+# Threads that parse and score batch requests off the event loop (NumPy releases the GIL)
+SCORING_THREADS = int(os.getenv("SCORING_THREADS", str(os.cpu_count() or 1)))
+# Rows scored per vectorized call and per streamed NDJSON chunk in /predict/batch
+BATCH_CHUNK_SIZE = 1000
+# Bytes copied per read when saving /train uploads to disk
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Per-stage latency and outcome counts of the prediction, training and upload pipelines, served at /metrics
+stage_seconds = Histogram(
+    "diabetes_stage_duration_seconds",
+    "Duration of each stage of the prediction, training and Nillion upload pipelines",
+    ["pipeline", "path", "stage", "outcome"],
+)
+predictions_total = Counter("diabetes_predictions_total", "Single-patient predictions served", ["path", "outcome"])
+training_jobs_total = Counter("diabetes_training_jobs_total", "Finished training jobs", ["mode", "outcome"])
+nillion_uploads_total = Counter("diabetes_nillion_uploads_total", "Model uploads to Nillion", ["result"])
+prediction_cache_total = Counter(
+    "diabetes_prediction_cache_total", "Prediction cache lookups by result (hit or miss)", ["path", "result"]
+)
+requests_shed_total = Counter(
+    "diabetes_requests_shed_total", "Predictions rejected by the admission limits", ["path", "status"]
+)
+
+# Status of background training jobs, kept on disk so it outlives worker recycling
+training_jobs = TrainingJobStore("model/jobs")
+# Uploads named by the SHA-256 of their bytes, and fitted models keyed by data and settings
+upload_store = UploadStore("uploads")
+training_cache = TrainingResultCache(TRAINING_CACHE_DIR)
+
+# Trained model and scaler, mapped once and shared by every request (and every worker's page cache)
+model_registry = ModelRegistry(
+    ARTIFACT_PATH, MODEL_PATH, SCALER_PATH, refresh_interval=MODEL_REFRESH_SECONDS
+)
+
+# Secure requests can hold a slot for minutes, so they never take capacity from local ones
+local_limiter = AdmissionLimiter(
+    "local", LOCAL_MAX_CONCURRENT, LOCAL_MAX_QUEUED, ADMISSION_MAX_WAIT, LOCAL_RETRY_AFTER
+)
+secure_limiter = AdmissionLimiter(
+    "secure", SECURE_MAX_CONCURRENT, SECURE_MAX_QUEUED, ADMISSION_MAX_WAIT, SECURE_RETRY_AFTER
+)
+# Threads are only started on first use, so forked workers do not inherit any
+scoring_executor = ThreadPoolExecutor(max_workers=SCORING_THREADS, thread_name_prefix="scoring")
+
+# Memory-only, keyed by an HMAC of the features and the model version they were scored with
+prediction_cache = PredictionCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL)
+
+def preload_model():
+    """Load the model and score one row so the first request finds everything warm"""
+    snapshot = model_registry.current()
+    if snapshot is not None:
+        snapshot.kernel.predict_proba(np.zeros(DIM))
+        snapshot.scaler.transform(np.zeros((1, DIM)))
+    return snapshot
+
+# Under gunicorn --preload this runs once in the master and every forked worker inherits it
+if MODEL_PRELOAD:
+    preload_model()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -87,10 +205,22 @@ class PredictionResponse(BaseModel):
     diabetes_probability: float
     risk_level: str
 
-class TrainingResponse(BaseModel):
+class TrainingJobResponse(BaseModel):
+    job_id: str
+    status: str
     message: str
-    accuracy: float
+
+class TrainingJobStatus(BaseModel):
+    job_id: str
+    status: str
+    mode: str = "full"
+    accuracy: Optional[float] = None
     model_stored: bool
+    upload_status: str
+    cached: bool = False
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
 
 # Helper functions
 async def new_client(network, id: int, private_key=None):
@@ -98,15 +228,18 @@ async def new_client(network, id: int, private_key=None):
     # Import the necessary modules only when needed
     _, _, _, _, _, NilChainPayer, NilChainPrivateKey, _, _, PrivateKey, _, VmClient, _, _ = get_nillion_imports()
     
-    nilchain_key = os.getenv(f"NILLION_NILCHAIN_PRIVATE_KEY_{id}")
-    if not nilchain_key:
-        raise HTTPException(status_code=500, detail=f"Missing environment variable NILLION_NILCHAIN_PRIVATE_KEY_{id}")
-        
-    payer = NilChainPayer(
-        network,
-        wallet_private_key=NilChainPrivateKey(bytes.fromhex(nilchain_key)),
-        gas_limit=10000000,
-    )
+    # The local stand-in does not charge for operations
+    payer = None
+    if NILLION_NETWORK != "local":
+        nilchain_key = os.getenv(f"NILLION_NILCHAIN_PRIVATE_KEY_{id}")
+        if not nilchain_key:
+            raise HTTPException(status_code=500, detail=f"Missing environment variable NILLION_NILCHAIN_PRIVATE_KEY_{id}")
+
+        payer = NilChainPayer(
+            network,
+            wallet_private_key=NilChainPrivateKey(bytes.fromhex(nilchain_key)),
+            gas_limit=10000000,
+        )
 
     # Use random key or passed private key
     signing_key = PrivateKey(private_key)
@@ -119,38 +252,63 @@ async def fund_chain(client, funds_amount=3000000):
     await client.add_funds(funds_amount)
     return True
 
+_nillion_network = None
+
+def load_nillion_env():
+    """Load Nillion credentials from .env or nillion.env once per process"""
+    _, _, load_dotenv, *_ = get_nillion_imports()
+    if os.path.exists(".env"):
+        load_dotenv(".env")
+    elif os.path.exists("nillion.env"):
+        load_dotenv("nillion.env")
+
+def get_nillion_network():
+    """Return the shared Network configuration for the Nillion testnet (or the local stand-in)"""
+    global _nillion_network
+    if _nillion_network is None:
+        _, _, _, _, Network, *_ = get_nillion_imports()
+        load_nillion_env()
+        if NILLION_NETWORK == "local":
+            _nillion_network = Network.from_env()
+        else:
+            _nillion_network = Network(
+                chain_id="nillion-chain-testnet-1",
+                chain_grpc_endpoint="https://testnet-nillion-grpc.lavenderfive.com",
+                nilvm_grpc_endpoint="https://node-1.nilvm-testnet-1.nillion-network.testnet.nillion.network:14311"
+            )
+    return _nillion_network
+
+async def create_party_client(party):
+    """Create a VmClient for one of the parties of the diabetes program"""
+    with stage_seconds.time(pipeline="nillion", path="secure", stage="client_create"):
+        return await new_client(get_nillion_network(), 0, PARTY_SIGNING_KEYS[party])
+
+async def check_client_health(client):
+    """Round trip to the network to make sure a pooled client still works"""
+    await client.balance()
+
+def parse_user_id(value):
+    """Parse a Nillion user id without importing the client at module load"""
+    *_, UserId, _ = get_nillion_imports()
+    return UserId.parse(value)
+
+# Warmed Nillion sessions and provider identifiers shared by all secure requests
+nillion_pool = NillionClientPool(
+    create_party_client,
+    PARTY_SIGNING_KEYS,
+    size=int(os.getenv("NILLION_POOL_SIZE", "2")),
+    health_check=check_client_health,
+)
+provider_info = ProviderInfoCache(PROVIDER_INFO_PATH, parse_user_id)
+
 def prepare_diabetes_data(custom_data_path=None):
     """Prepare the diabetes dataset with optional custom data"""
-    # Default Pima Indians Diabetes dataset
-    url = "https://raw.githubusercontent.com/jbrownlee/Datasets/master/pima-indians-diabetes.data.csv"
-    column_names = [
-        'Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness',
-        'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age', 'Outcome'
-    ]
-    
-    # Load the dataset
-    df = pd.read_csv(url, names=column_names)
-    
-    # If custom data is provided, append it
-    if custom_data_path and os.path.exists(custom_data_path):
-        custom_df = pd.read_csv(custom_data_path)
-        
-        # Ensure the custom data has the same columns
-        if set(custom_df.columns) == set(column_names):
-            df = pd.concat([df, custom_df], ignore_index=True)
-        else:
-            # Try to map columns if they don't match exactly
-            mapped_df = pd.DataFrame(columns=column_names)
-            for col in column_names:
-                if col in custom_df.columns:
-                    mapped_df[col] = custom_df[col]
-            
-            if not mapped_df.empty:
-                df = pd.concat([df, mapped_df], ignore_index=True)
-    
-    # Split features and target
-    X = df.drop('Outcome', axis=1)
-    y = df['Outcome']
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+    from dataset import load_training_dataset
+
+    # Pima Indians Diabetes dataset from the local cache, plus any uploaded rows
+    X, y = load_training_dataset(custom_data_path)
     
     # Split the data into training and testing sets
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
@@ -162,8 +320,11 @@ def prepare_diabetes_data(custom_data_path=None):
     
     return X_train, X_test, y_train, y_test, scaler
 
-def train_diabetes_model(custom_data_path=None):
-    """Train the diabetes prediction model with optional custom data"""
+def fit_diabetes_model(custom_data_path=None):
+    """Fit and evaluate the diabetes model without publishing it (safe to run in a worker process)"""
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import accuracy_score
+
     X_train, X_test, y_train, y_test, scaler = prepare_diabetes_data(custom_data_path)
     
     # Train logistic regression model
@@ -174,41 +335,50 @@ def train_diabetes_model(custom_data_path=None):
     y_pred = model.predict(X_test)
     accuracy = accuracy_score(y_test, y_pred)
     
-    # Save the model and scaler
-    joblib.dump(model, MODEL_PATH)
-    joblib.dump(scaler, SCALER_PATH)
+    # Fold the scaler into the model weights and make sure scoring is unchanged
+    kernel = FusedKernel.from_model(model, scaler)
+    kernel.check_parity(model, scaler, scaler.inverse_transform(X_test))
     
-    return model, scaler, accuracy
+    return model, scaler, accuracy, kernel
 
-async def store_model_on_nillion(model):
-    """Store the model on the Nillion network"""
-    # Import the necessary modules only when needed
-    na, na_client, load_dotenv, InputPartyBinding, Network, _, _, _, Permissions, _, _, _, UserId, SklearnClient = get_nillion_imports()
+def fit_training_job(mode, custom_data_path):
+    """Fit the model for a training job; runs in the training process pool"""
+    if mode == "incremental":
+        from incremental_training import fit_incremental_model
+        return fit_incremental_model(custom_data_path)
+    if mode == "cv":
+        from grid_training import fit_cv_model
+        return fit_cv_model(custom_data_path)
+    return fit_diabetes_model(custom_data_path)
+
+def train_diabetes_model(custom_data_path=None):
+    """Train the diabetes prediction model with optional custom data"""
+    model, scaler, accuracy, kernel = fit_diabetes_model(custom_data_path)
     
-    # Load environment variables
-    if os.path.exists(".env"):
-        load_dotenv(".env")
-    elif os.path.exists("nillion.env"):
-        load_dotenv("nillion.env")
+    # Save the model, scaler and fused kernel and make them the served snapshot
+    model_registry.publish(model, scaler, kernel)
+    prediction_cache.clear()
     
-    # Connect to the Nillion network
-    network = Network(
-        chain_id="nillion-chain-testnet-1",
-        chain_grpc_endpoint="https://testnet-nillion-grpc.lavenderfive.com",
-        nilvm_grpc_endpoint="https://node-1.nilvm-testnet-1.nillion-network.testnet.nillion.network:14311"
-    ) 
-
-    # Create clients for model provider and patient
-    model_provider = await new_client(
-        network,
-        0,
-        b'\xbf\xdf7\xa9\x1eL\x10i"\xd8\x1f\xbb\xe8\r;\x1b`\x1a\xd1\xa1;\xef\xd8\xbbf|\xf9\x12\xe9\xef\x03\xc7',
-    )
-    patient = await new_client(
-        network,
-        0,
-        b"\x15\xa0\xc1\xcc\x12\xb5r\xf9\xcb\x89\x95\x8d\x94\xfb\xfe)\xdf\xfe\xbd3\x00\x18\x80\xc1\xd9W\x8b\xf7\xc0\x92S\xe9",
-    )
+    return model, scaler, accuracy
+
+_nillion_upload_lock = asyncio.Lock()
+
+async def store_model_on_nillion(snapshot, known=None):
+    """Store a model snapshot on the Nillion network, skipping content that is already stored
+
+    `known` is an earlier upload of possibly the same model (from the training
+    cache); it is reused if the served store holds a different model.
+    """
+    try:
+        with stage_seconds.time(pipeline="store_model", path="secure", stage="total"):
+            return await _store_model_on_nillion(snapshot, known)
+    except Exception:
+        nillion_uploads_total.inc(result="failed")
+        raise
+
+async def _store_model_on_nillion(snapshot, known=None):
+    # Import the necessary modules only when needed
+    na, na_client, _, _, _, _, _, _, Permissions, _, _, _, _, SklearnClient = get_nillion_imports()
     
     program_name = "diabetes_prediction"
     program_mir_path = f"./target/{program_name}.nada.bin"
@@ -221,132 +391,315 @@ async def store_model_on_nillion(model):
         with open(program_mir_path, "wb") as f:
             f.write(b"mock program data")
 
-    # Store the program
-    program_mir = open(program_mir_path, "rb").read()
-    program_id = await model_provider.store_program(program_name, program_mir).invoke()
+    programs = {}
+    with open(program_mir_path, "rb") as program_file:
+        programs[program_name] = program_file.read()
 
-    # Store the model as secrets
-    model_client = SklearnClient(model)
-    model_secrets = model_client.export_state_as_secrets(
-        "diabetes_model", na_client.SecretRational
-    )
-    
-    # Create permissions for the patient to use the model
-    permissions = Permissions.defaults_for_user(model_provider.user_id).allow_compute(
-        patient.user_id, program_id
-    )
+    # The batched program is optional; it is only stored once it has been built
+    batch_program_mir_path = f"./target/{BATCH_PROGRAM_NAME}.nada.bin"
+    if os.path.exists(batch_program_mir_path):
+        with open(batch_program_mir_path, "rb") as program_file:
+            programs[BATCH_PROGRAM_NAME] = program_file.read()
 
-    # Store the model on the Nillion network
-    model_store_id = await model_provider.store_values(
-        model_secrets, ttl_days=1, permissions=permissions
-    ).invoke()
-
-    # Save the necessary information for the patient to use
-    provider_variables = {
-        "program_id": str(program_id),
-        "model_store_id": model_store_id.hex,
-        "model_provider_user_id": str(model_provider.user_id),
-    }
-    
-    with open(PROVIDER_INFO_PATH, "w") as provider_variables_file:
-        json.dump(provider_variables, provider_variables_file)
-    
-    return program_id, model_store_id, model_provider.user_id
+    # Export the model as secrets, in the precision recorded in its bundle; nothing
+    # is awaited between setting the process-global scale and encoding. Programs
+    # compiled with another scale would silently mis-scale every prediction.
+    fixed_point = snapshot.fixed_point
+    for name in programs:
+        check_compiled_fixed_point(f"./target/{name}.nada.bin", fixed_point)
+    with stage_seconds.time(pipeline="store_model", path="secure", stage="export_secrets"):
+        na.set_log_scale(fixed_point.log_scale)
+        model_client = SklearnClient(snapshot.model.to_estimator())
+        model_secrets = model_client.export_state_as_secrets(
+            "diabetes_model", na_client.SecretRational
+        )
 
-async def predict_diabetes(patient_data):
-    """Make a prediction using the stored model on Nillion"""
-    # Import the necessary modules only when needed
-    na, na_client, load_dotenv, InputPartyBinding, Network, _, _, OutputPartyBinding, Permissions, _, _, _, UserId, _ = get_nillion_imports()
-    
-    # Load environment variables
-    if os.path.exists(".env"):
-        load_dotenv(".env")
-    elif os.path.exists("nillion.env"):
-        load_dotenv("nillion.env")
-    
-    # Load provider information
-    if not os.path.exists(PROVIDER_INFO_PATH):
-        raise FileNotFoundError("Model not deployed to Nillion yet. Please train the model first.")
-        
-    with open(PROVIDER_INFO_PATH, "r") as provider_variables_file:
-        provider_variables = json.load(provider_variables_file)
+    # Key the uploads by content so unchanged programs and models are not stored again
+    program_hash = hash_programs(programs)
+    model_hash = hash_model_secrets(program_hash, model_secrets)
 
-    program_id = provider_variables["program_id"]
-    model_store_id = uuid.UUID(hex=provider_variables["model_store_id"])
-    model_provider_user_id = UserId.parse(provider_variables["model_provider_user_id"])
+    async with _nillion_upload_lock:
+        previous = read_provider_variables(PROVIDER_INFO_PATH) or {}
+        if known and previous.get("model_hash") != model_hash and known.get("model_hash") == model_hash:
+            previous = known
+        same_program = previous.get("program_hash") == program_hash
+        same_model = same_program and previous.get("model_hash") == model_hash
+        if same_model and not is_expiring(previous, MODEL_TTL_RENEW_MARGIN):
+            print("Model already stored on Nillion, skipping upload")
+            nillion_uploads_total.inc(result="skipped")
+            if previous is known:
+                atomic_write_json(previous, PROVIDER_INFO_PATH)
+                prediction_cache.clear()
+                model_ttl_renewer.wake()
+            return provider_info.set(previous)
 
-    # Scale patient data
-    if not os.path.exists(SCALER_PATH):
-        raise FileNotFoundError("Scaler not found. Please train the model first.")
+        async with nillion_pool.session(MODEL_PROVIDER_NAME) as model_provider, \
+                nillion_pool.session(PATIENT_NAME) as patient:
+            # Store the programs
+            if same_program:
+                program_id = previous["program_id"]
+                batch_program_id = previous.get("batch_program_id")
+            else:
+                with stage_seconds.time(pipeline="store_model", path="secure", stage="store_program"):
+                    program_id = await model_provider.store_program(program_name, programs[program_name]).invoke()
+                    batch_program_id = None
+                    if BATCH_PROGRAM_NAME in programs:
+                        batch_program_id = await model_provider.store_program(
+                            BATCH_PROGRAM_NAME, programs[BATCH_PROGRAM_NAME]
+                        ).invoke()
+            
+            # Create permissions for the patient to use the model
+            permissions = Permissions.defaults_for_user(model_provider.user_id).allow_compute(
+                patient.user_id, program_id
+            )
+            if batch_program_id is not None:
+                permissions = permissions.allow_compute(patient.user_id, batch_program_id)
+
+            # Store the model on the Nillion network, extending the existing
+            # store in place if the same model is still there
+            update_identifier = None
+            if same_model and previous.get("expires_at", 0) > time.time():
+                update_identifier = uuid.UUID(hex=previous["model_store_id"])
+            with stage_seconds.time(pipeline="store_model", path="secure", stage="store_values"):
+                model_store_id = await model_provider.store_values(
+                    model_secrets,
+                    ttl_days=MODEL_TTL_DAYS,
+                    permissions=permissions,
+                    update_identifier=update_identifier,
+                ).invoke()
+
+        # Save the necessary information for the patient to use
+        provider_variables = {
+            "program_id": str(program_id),
+            "model_store_id": model_store_id.hex,
+            "model_provider_user_id": str(model_provider.user_id),
+            "batch_program_id": str(batch_program_id) if batch_program_id is not None else None,
+            "program_hash": program_hash,
+            "model_hash": model_hash,
+            "expires_at": time.time() + MODEL_TTL_DAYS * 86400,
+            # Patients encode inputs and decode results with the same precision
+            "fixed_point": fixed_point._asdict(),
+        }
         
-    scaler = joblib.load(SCALER_PATH)
-    patient_data_scaled = scaler.transform([patient_data])[0]
-
-    # Connect to the Nillion network
-    network = Network(
-        chain_id="nillion-chain-testnet-1",
-        chain_grpc_endpoint="https://testnet-nillion-grpc.lavenderfive.com",
-        nilvm_grpc_endpoint="https://node-1.nilvm-testnet-1.nillion-network.testnet.nillion.network:14311"
-    ) 
-    
-    # Create client for patient
-    patient = await new_client(
-        network,
-        0,
-        b"\x15\xa0\xc1\xcc\x12\xb5r\xf9\xcb\x89\x95\x8d\x94\xfb\xfe)\xdf\xfe\xbd3\x00\x18\x80\xc1\xd9W\x8b\xf7\xc0\x92S\xe9",
-    )
+        atomic_write_json(provider_variables, PROVIDER_INFO_PATH)
+        info = provider_info.set(provider_variables)
+        nillion_uploads_total.inc(result="stored")
+        prediction_cache.clear()
 
-    # Store input as secret values
-    patient_features = na_client.array(patient_data_scaled, "patient_data", na_client.SecretRational)
+    model_ttl_renewer.wake()
+    return info
+
+async def renew_model_on_nillion():
+    """Re-store the served model before its Nillion TTL expires"""
+    snapshot = model_registry.current()
+    if snapshot is not None:
+        await store_model_on_nillion(snapshot)
+
+# Training runs in a separate process so fitting never blocks the event loop
+_training_executor = None
+_training_tasks = set()
+
+def get_training_executor():
+    """Create the training process pool on first use (after gunicorn has forked)"""
+    global _training_executor
+    if _training_executor is None:
+        _training_executor = ProcessPoolExecutor(max_workers=1)
+    return _training_executor
+
+async def run_training_job(job):
+    """Fit the model in the process pool, publish it and upload it to Nillion"""
+    job_id = job["job_id"]
+    mode = job.get("mode", "full")
+    reused = False
+    try:
+        loop = asyncio.get_running_loop()
+        digest = await loop.run_in_executor(None, upload_store.digest_of, job["data_path"])
+        key = training_cache.key(mode, digest)
+        if job["status"] in (QUEUED, TRAINING):
+            # Fitting without the upload would publish a model of the base data alone
+            if digest is None:
+                raise FileNotFoundError(f"The uploaded data {job['data_path']} no longer exists; upload it again")
+            # The same data and settings were trained on before: serve that model again
+            cached = training_cache.get(key)
+            if cached is not None:
+                with stage_seconds.time(pipeline="train", path="local", stage="publish"):
+                    model_registry.restore(training_cache.artifact_path(key))
+                    prediction_cache.clear()
+                reused = True
+                training_jobs.update(job_id, status=UPLOADING, accuracy=cached["accuracy"], cached=True)
+            else:
+                training_jobs.update(job_id, status=TRAINING)
+                # Fitting happens in the pool process, so it is timed here as one stage
+                with stage_seconds.time(pipeline="train", path="local", stage="fit"):
+                    model, scaler, accuracy, kernel = await loop.run_in_executor(
+                        get_training_executor(), fit_training_job, mode, job["data_path"]
+                    )
+                with stage_seconds.time(pipeline="train", path="local", stage="publish"):
+                    model_registry.publish(model, scaler, kernel)
+                    prediction_cache.clear()
+                if key is not None:
+                    training_cache.put(key, mode, model, scaler, kernel, accuracy)
+                training_jobs.update(job_id, status=UPLOADING, accuracy=float(accuracy))
+    except Exception as e:
+        training_jobs.update(job_id, status=FAILED, error=str(e))
+        training_jobs_total.inc(mode=mode, outcome="failed")
+        return
+    training_jobs_total.inc(mode=mode, outcome="cached" if reused else "completed")
+
+    # The served model is already live; the upload only affects secure predictions
+    try:
+        cached = training_cache.get(key)
+        await store_model_on_nillion(model_registry.current(), cached and cached["provider_variables"])
+        if cached is not None:
+            training_cache.record_upload(key, read_provider_variables(PROVIDER_INFO_PATH))
+        training_jobs.update(job_id, status=COMPLETED, model_stored=True, upload_status="stored")
+    except Exception as e:
+        training_jobs.update(job_id, status=COMPLETED, upload_status="failed", error=str(e))
+
+def start_training_job(job):
+    """Run a training job in the background, keeping a reference so it is not collected"""
+    task = asyncio.create_task(run_training_job(job))
+    _training_tasks.add(task)
+    task.add_done_callback(_training_tasks.discard)
+
+def read_model_expiry():
+    """Unix time at which the stored model expires, or None if not tracked"""
+    provider_variables = read_provider_variables(PROVIDER_INFO_PATH)
+    return provider_variables.get("expires_at") if provider_variables else None
 
+# Keeps the stored model alive on Nillion between trainings
+model_ttl_renewer = TtlRenewalScheduler(read_model_expiry, renew_model_on_nillion, MODEL_TTL_RENEW_MARGIN)
+
+async def run_patient_computation(patient, program_id, patient_features):
+    """Store patient secrets, run a program against the stored model and return its outputs"""
+    _, _, _, InputPartyBinding, _, _, _, OutputPartyBinding, Permissions, _, _, _, _, _ = get_nillion_imports()
+    info = provider_info.get()
+
+    # Store input as secret values
     permissions = Permissions.defaults_for_user(patient.user_id).allow_compute(
         patient.user_id, program_id
     )
-    patient_data_store_id = await patient.store_values(
-        patient_features, ttl_days=1, permissions=permissions
-    ).invoke()
+    with stage_seconds.time(pipeline="predict", path="secure", stage="store_values"):
+        patient_data_store_id = await patient.store_values(
+            patient_features, ttl_days=1, permissions=permissions
+        ).invoke()
 
     # Run computation
-    model_provider_name = "Provider"
-    patient_name = "Patient"
     input_bindings = [
-        InputPartyBinding(model_provider_name, model_provider_user_id),
-        InputPartyBinding(patient_name, patient.user_id),
+        InputPartyBinding(MODEL_PROVIDER_NAME, info.model_provider_user_id),
+        InputPartyBinding(PATIENT_NAME, patient.user_id),
     ]
-    output_bindings = [OutputPartyBinding(patient_name, [patient.user_id])]
+    output_bindings = [OutputPartyBinding(PATIENT_NAME, [patient.user_id])]
 
-    compute_id = await patient.compute(
-        program_id,
-        input_bindings,
-        output_bindings,
-        values={},
-        value_ids=[model_store_id, patient_data_store_id],
-    ).invoke()
+    with stage_seconds.time(pipeline="predict", path="secure", stage="compute"):
+        compute_id = await patient.compute(
+            program_id,
+            input_bindings,
+            output_bindings,
+            values={},
+            value_ids=[info.model_store_id, patient_data_store_id],
+        ).invoke()
 
-    result = await patient.retrieve_compute_results(compute_id).invoke()
+    with stage_seconds.time(pipeline="predict", path="secure", stage="retrieve_compute_results"):
+        return await patient.retrieve_compute_results(compute_id).invoke()
 
-    # Compute probability
-    logit_value = result.get("diabetes_logit_0").value
-    probability = 1 / (1 + np.exp(-logit_value / 2**16))
+def observe_session_wait(wait_start):
+    """Record how long a secure prediction waited for a pooled patient client"""
+    stage_seconds.observe(
+        time.perf_counter() - wait_start, pipeline="predict", path="secure", stage="session_wait", outcome="ok"
+    )
+
+async def predict_diabetes(patient_data):
+    """Make a prediction using the stored model on Nillion"""
+    # Import the necessary modules only when needed
+    na, na_client, *_ = get_nillion_imports()
     
-    return probability
+    # Load provider information; inputs are encoded with the precision the model was stored with
+    info = provider_info.get()
+
+    # Scale patient data
+    with stage_seconds.time(pipeline="predict", path="secure", stage="scale"):
+        snapshot = model_registry.current()
+        if snapshot is None:
+            raise FileNotFoundError("Scaler not found. Please train the model first.")
+
+        patient_data_scaled = snapshot.scaler.transform([patient_data])[0]
+
+    # Borrow a warmed client for the patient
+    wait_start = time.perf_counter()
+    async with nillion_pool.session(PATIENT_NAME) as patient:
+        observe_session_wait(wait_start)
+        # The scale is process-global, so set it right before encoding with no await in between
+        na.set_log_scale(info.fixed_point.log_scale)
+        patient_features = na_client.array(patient_data_scaled, "patient_data", na_client.SecretRational)
+        result = await run_patient_computation(patient, info.program_id, patient_features)
+
+    # Compute probability
+    return decode_probability(result.get("diabetes_logit_0").value, info.fixed_point.log_scale)
+
+async def predict_diabetes_each(patients):
+    """Score patients with one concurrent computation each; a failed patient's entry is its exception"""
+    return await asyncio.gather(
+        *(predict_diabetes(patient_data) for patient_data in patients), return_exceptions=True
+    )
+
+async def predict_diabetes_batch(patients):
+    """Score a matrix of patients on Nillion, BATCH_SIZE patients per computation
+
+    Without a deployed batched program every patient is scored on its own,
+    concurrently, and a failed patient's entry is its exception.
+    """
+    # Import the necessary modules only when needed
+    na, na_client, *_ = get_nillion_imports()
+
+    info = provider_info.get()
+    if info.batch_program_id is None:
+        return await predict_diabetes_each(patients)
+
+    with stage_seconds.time(pipeline="predict", path="secure", stage="scale"):
+        snapshot = model_registry.current()
+        if snapshot is None:
+            raise FileNotFoundError("Scaler not found. Please train the model first.")
+
+        patients_scaled = snapshot.scaler.transform(np.asarray(patients, dtype=float).reshape(-1, DIM))
+
+    probabilities = []
+    wait_start = time.perf_counter()
+    async with nillion_pool.session(PATIENT_NAME) as patient:
+        observe_session_wait(wait_start)
+        for start in range(0, len(patients_scaled), BATCH_SIZE):
+            chunk = patients_scaled[start:start + BATCH_SIZE]
+
+            # The program has a fixed batch shape, so pad the last chunk with zero rows
+            padded = np.zeros((BATCH_SIZE, DIM))
+            padded[:len(chunk)] = chunk
+            na.set_log_scale(info.fixed_point.log_scale)
+            patient_features = na_client.array(padded, "patient_data", na_client.SecretRational)
+            result = await run_patient_computation(patient, info.batch_program_id, patient_features)
+
+            probabilities.extend(
+                decode_probability(result.get(f"diabetes_logit_{i}").value, info.fixed_point.log_scale)
+                for i in range(len(chunk))
+            )
+
+    return np.array(probabilities)
+
+# Coalesces concurrent secure /predict calls into batched Nillion computations
+secure_batcher = MicroBatcher(
+    predict_diabetes_batch,
+    max_batch_size=BATCH_SIZE,
+    max_wait=SECURE_BATCH_WINDOW,
+    max_in_flight=nillion_pool.size,
+)
 
 def process_patient_data(data: Union[PatientData, Dict, List, str]):
     """Convert patient data from various formats to a standardized numpy array"""
     if isinstance(data, PatientData):
         # If the data is a Pydantic model, convert to a list in the correct order
-        column_names = [
-            'Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness',
-            'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age'
-        ]
-        return np.array([getattr(data, col) for col in column_names])
+        return np.array([getattr(data, col) for col in FEATURE_COLUMNS])
     elif isinstance(data, dict):
         # If the data is a dictionary, convert to a list in the correct order
-        column_names = [
-            'Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness',
-            'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age'
-        ]
-        return np.array([float(data.get(col, 0)) for col in column_names])
+        return np.array([float(data.get(col, 0)) for col in FEATURE_COLUMNS])
     elif isinstance(data, list):
         # If the data is a list, ensure it's the right length
         if len(data) != 8:
@@ -361,6 +714,114 @@ def process_patient_data(data: Union[PatientData, Dict, List, str]):
     else:
         raise ValueError("Unsupported data format")
 
+def parse_batch_row(row):
+    """Validate one /predict/batch row and return its feature vector"""
+    if isinstance(row, dict):
+        missing = [col for col in FEATURE_COLUMNS if row.get(col) is None]
+        if missing:
+            raise ValueError(f"Missing features: {missing}")
+        values = [row[col] for col in FEATURE_COLUMNS]
+    elif isinstance(row, list):
+        if len(row) != len(FEATURE_COLUMNS):
+            raise ValueError("Patient data must have 8 features")
+        values = row
+    else:
+        raise ValueError("Unsupported data format")
+
+    features = np.array([float(x) for x in values])
+    if not validate_features(features.reshape(1, -1))[0]:
+        raise ValueError("Patient data must contain only finite, non-negative numbers")
+    return features
+
+def iter_json_batches(rows):
+    """Split a JSON array of patients into (row indices, feature matrix, errors) chunks"""
+    for start in range(0, len(rows), BATCH_CHUNK_SIZE):
+        indices, features, errors = [], [], []
+        for index, row in enumerate(rows[start:start + BATCH_CHUNK_SIZE], start):
+            try:
+                features.append(parse_batch_row(row))
+                indices.append(index)
+            except (TypeError, ValueError) as e:
+                errors.append((index, str(e)))
+        matrix = np.array(features, dtype=float).reshape(-1, len(FEATURE_COLUMNS))
+        yield indices, matrix, errors
+
+def iter_csv_batches(csv_file):
+    """Read an uploaded CSV of patients chunk by chunk into (row indices, feature matrix, errors)"""
+    import pandas as pd
+
+    start = 0
+    for chunk in pd.read_csv(csv_file, chunksize=BATCH_CHUNK_SIZE):
+        missing = [col for col in FEATURE_COLUMNS if col not in chunk.columns]
+        if missing:
+            raise ValueError(f"CSV is missing required columns: {missing}")
+
+        values = chunk[FEATURE_COLUMNS].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        valid = validate_features(values)
+        row_numbers = np.arange(start, start + len(chunk))
+        errors = [
+            (int(index), "Patient data must contain 8 finite, non-negative numeric features")
+            for index in row_numbers[~valid]
+        ]
+        yield row_numbers[valid].tolist(), values[valid], errors
+        start += len(chunk)
+
+def score_patient_matrix(snapshot, features):
+    """Scale and score a 2-D feature matrix in a single vectorized call"""
+    return snapshot.kernel.predict_proba(features)
+
+def format_batch_results(indices, probabilities, errors):
+    """Render one chunk of /predict/batch results as NDJSON in input row order"""
+    results = [{"row": index, "error": error} for index, error in errors]
+    results.extend(
+        {
+            "row": index,
+            "diabetes_probability": float(probability),
+            "risk_level": "High" if probability > 0.5 else "Low",
+        }
+        for index, probability in zip(indices, probabilities)
+    )
+    results.sort(key=lambda result: result["row"])
+    return "".join(json.dumps(result) + "\n" for result in results)
+
+def score_next_batch(snapshot, batches):
+    """Parse and score the next chunk of a batch request as NDJSON, or None when it is done"""
+    for indices, features, errors in batches:
+        probabilities = score_patient_matrix(snapshot, features) if len(indices) else []
+        return format_batch_results(indices, probabilities, errors)
+    return None
+
+async def stream_batch_predictions(snapshot, batches):
+    """Yield NDJSON chunks with one prediction or error per input row, parsed and scored on the scoring threads"""
+    loop = asyncio.get_running_loop()
+    try:
+        async with local_limiter.slot():
+            while True:
+                chunk = await loop.run_in_executor(scoring_executor, score_next_batch, snapshot, batches)
+                if chunk is None:
+                    break
+                yield chunk
+    except Exception as e:
+        # Headers are already sent, so report the failure in-band
+        yield json.dumps({"error": str(e)}) + "\n"
+
+async def stream_secure_batch_predictions(batches):
+    """Yield NDJSON chunks scored on Nillion with the batched program"""
+    try:
+        async with secure_limiter.slot():
+            for indices, features, errors in batches:
+                results = await predict_diabetes_batch(features) if len(indices) else []
+                # Patients scored one by one fail on their own; report them as row errors
+                scored = [(index, result) for index, result in zip(indices, results)
+                          if not isinstance(result, Exception)]
+                errors = list(errors) + [(index, str(result)) for index, result in zip(indices, results)
+                                         if isinstance(result, Exception)]
+                yield format_batch_results([index for index, _ in scored],
+                                           [result for _, result in scored], errors)
+    except Exception as e:
+        # Headers are already sent, so report the failure in-band
+        yield json.dumps({"error": str(e)}) + "\n"
+
 # Routes
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
@@ -382,7 +843,11 @@ async def home(request: Request):
         <h2>Endpoints:</h2>
         <h3>Train Model</h3>
         <p><code>POST /train</code></p>
-        <p>Upload a CSV file to train the model. The file should have the following columns:</p>
+        <p>Upload a CSV file to queue a training job. The response contains a <code>job_id</code>;
+        poll <code>GET /train/{job_id}</code> for progress, accuracy and Nillion upload status.
+        Add <code>?mode=incremental</code> to update the model from only the uploaded rows, or
+        <code>?mode=cv</code> to pick the hyperparameters by cross-validation on all cores.
+        The file should have the following columns:</p>
         <ul>
             <li>Pregnancies</li>
             <li>Glucose</li>
@@ -412,52 +877,121 @@ async def home(request: Request):
 }
         </pre>
         <p>Set use_local: true for local prediction or false for secure Nillion prediction.</p>
+
+        <h3>Batch Predict</h3>
+        <p><code>POST /predict/batch</code></p>
+        <p>Send a JSON array of patients in the format above, or upload a CSV file with the feature columns.
+        Results are streamed back as NDJSON, one line per input row, with an <code>error</code> field for rows that fail validation
+        (missing, non-numeric, non-finite or negative values).
+        Add <code>?use_local=false</code> to score on Nillion, several patients per secure computation.</p>
+        <p>For bulk integrations, send an <code>(N, 8)</code> float matrix in the column order above as
+        <code>application/x-npy</code> or <code>application/vnd.apache.arrow.stream</code>
+        (one float column per feature). The response is one <code>diabetes_probability</code> per row in the same format,
+        NaN for rows with non-finite or negative values and for patients whose secure computation failed,
+        counted in the <code>X-Invalid-Rows</code> header.</p>
     </body>
     </html>
     """
     return HTMLResponse(content=html_content)
 
-@app.post("/train", response_model=TrainingResponse)
-async def train_model(file: UploadFile = File(...)):
-    """Train the model with optional custom data"""
+@app.post("/train", response_model=TrainingJobResponse, status_code=202)
+async def train_model(file: UploadFile = File(...), mode: str = "full"):
+    """Queue a training job with optional custom data"""
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="File must be a CSV")
+    if mode not in ("full", "incremental", "cv"):
+        raise HTTPException(status_code=400, detail="mode must be 'full', 'incremental' or 'cv'")
 
-    # Save uploaded file temporarily
-    filepath = os.path.join('uploads', file.filename)
-    with open(filepath, 'wb') as buffer:
-        buffer.write(await file.read())
-
+    # Copy the upload to disk a chunk at a time, hashing it on the way; it is parsed
+    # later by the training job. Stored by content, so client filenames never address
+    # the filesystem and repeated uploads of the same bytes share one file. Disk
+    # writes run on the default executor so a large upload never stalls the event loop.
+    loop = asyncio.get_running_loop()
+    upload = await loop.run_in_executor(None, upload_store.begin)
     try:
-        model, scaler, accuracy = train_diabetes_model(filepath)
-        
-        # Create background task to store model on Nillion
-        background_tasks = asyncio.create_task(store_model_on_nillion(model))
-        
-        return TrainingResponse(
-            message="Model trained successfully",
-            accuracy=float(accuracy),
-            model_stored=True
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+            await loop.run_in_executor(None, upload.write, chunk)
+    except BaseException:
+        await loop.run_in_executor(None, upload.discard)
+        raise
+    # Flushing, fsync and the rename into the content-addressed store block too
+    _, filepath = await loop.run_in_executor(None, upload_store.commit, upload, file.filename)
+
+    job = training_jobs.create(filepath, mode)
+    start_training_job(job)
+    
+    return TrainingJobResponse(
+        job_id=job["job_id"],
+        status=job["status"],
+        message="Training job queued"
+    )
+
+@app.get("/train/{job_id}", response_model=TrainingJobStatus)
+async def training_job_status(job_id: str):
+    """Report progress, accuracy and Nillion upload status of a training job"""
+    job = training_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Training job not found")
+    return TrainingJobStatus(**job)
 
 @app.post("/predict", response_model=PredictionResponse)
 async def predict(data: PatientData):
     """Make a prediction using the trained model"""
+    snapshot = None
+    if data.use_local:
+        # The first call loads the model artifacts from disk
+        try:
+            with stage_seconds.time(pipeline="predict", path="local", stage="load_model"):
+                snapshot = model_registry.current()
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    path = "local" if snapshot is not None else "secure"
+    limiter = local_limiter if snapshot is not None else secure_limiter
+
+    try:
+        async with limiter.slot():
+            with stage_seconds.time(pipeline="predict", path=path, stage="total"):
+                response = await score_prediction(data, snapshot)
+    except Overloaded:
+        raise
+    except Exception:
+        predictions_total.inc(path=path, outcome="error")
+        raise
+    predictions_total.inc(path=path, outcome="ok")
+    return response
+
+def prediction_model_version(snapshot):
+    """Identify the model a prediction comes from: the local snapshot, or the scaler plus stored Nillion model"""
+    if snapshot is not None:
+        return f"local:{snapshot.version}"
+    current = model_registry.current()
+    info = provider_info.get()
+    return f"secure:{current.version if current else None}:{info.model_store_id.hex}"
+
+async def score_prediction(data, snapshot):
+    """Score one patient locally when a snapshot is given, otherwise on Nillion"""
     try:
         patient_data = process_patient_data(data)
+
+        cache_key = None
+        if prediction_cache.enabled:
+            path = "local" if snapshot is not None else "secure"
+            cache_key = prediction_cache.key(prediction_model_version(snapshot), patient_data)
+            probability = prediction_cache.get(cache_key)
+            prediction_cache_total.inc(path=path, result="miss" if probability is None else "hit")
+            if probability is not None:
+                return PredictionResponse(
+                    diabetes_probability=probability,
+                    risk_level="High" if probability > 0.5 else "Low"
+                )
         
         # For local prediction (faster)
-        if data.use_local and os.path.exists(MODEL_PATH):
-            model = joblib.load(MODEL_PATH)
-            scaler = joblib.load(SCALER_PATH)
-            
-            # Scale the patient data
-            patient_data_scaled = scaler.transform([patient_data])[0]
-            
-            # Make prediction
-            probability = model.predict_proba([patient_data_scaled])[0][1]
+        if snapshot is not None:
+            # Scale and score in one fused dot product
+            with stage_seconds.time(pipeline="predict", path="local", stage="score"):
+                probability = snapshot.kernel.predict_proba(patient_data)
+            if cache_key is not None:
+                prediction_cache.put(cache_key, float(probability))
             
             return PredictionResponse(
                 diabetes_probability=float(probability),
@@ -466,7 +1000,13 @@ async def predict(data: PatientData):
         
         # For Nillion prediction (secure but more complex)
         else:
-            probability = await predict_diabetes(patient_data)
+            # Coalescing only pays off when one computation scores the whole batch
+            if SECURE_BATCH_WINDOW > 0 and provider_info.get().batch_program_id is not None:
+                probability = await secure_batcher.submit(patient_data)
+            else:
+                probability = await predict_diabetes(patient_data)
+            if cache_key is not None:
+                prediction_cache.put(cache_key, float(probability))
             
             return PredictionResponse(
                 diabetes_probability=float(probability),
@@ -476,7 +1016,164 @@ async def predict(data: PatientData):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/predict/batch")
+async def predict_batch(request: Request, use_local: bool = True):
+    """Score many patients at once, streaming NDJSON results"""
+    snapshot = model_registry.current()
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="Model not trained yet. Please train the model first.")
+
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith((NPY_MEDIA_TYPE, ARROW_MEDIA_TYPE)):
+        return await predict_binary_batch(request, snapshot, content_type, use_local)
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str) or not upload.filename.endswith('.csv'):
+            raise HTTPException(status_code=400, detail="File must be a CSV")
+        batches = iter_csv_batches(upload.file)
+    else:
+        try:
+            rows = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array of patients")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array of patients")
+        batches = iter_json_batches(rows)
+
+    # Shed before the headers are sent; a stream that waits too long for a slot reports it in-band
+    if use_local:
+        local_limiter.check()
+        stream = stream_batch_predictions(snapshot, batches)
+    else:
+        secure_limiter.check()
+        stream = stream_secure_batch_predictions(batches)
+    return StreamingResponse(stream, media_type="application/x-ndjson")
+
+async def predict_binary_batch(request, snapshot, content_type, use_local):
+    """Score an NPY or Arrow IPC feature matrix and answer in the same format
+
+    Rows that fail validation, and patients whose secure computation failed,
+    get a NaN probability; their count is returned in the X-Invalid-Rows header.
+    """
+    body = await request.body()
+    try:
+        if content_type.startswith(NPY_MEDIA_TYPE):
+            features = read_npy_matrix(body)
+        else:
+            features = read_arrow_matrix(body)
+    except UnsupportedFormatError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid feature matrix: {e}")
+
+    loop = asyncio.get_running_loop()
+    valid = await loop.run_in_executor(scoring_executor, validate_features, features)
+    probabilities = np.full(len(features), np.nan)
+    try:
+        # Boolean indexing copies, so only do it when some rows are invalid
+        valid_features = features if valid.all() else features[valid]
+        if len(valid_features):
+            if use_local:
+                async with local_limiter.slot():
+                    probabilities[valid] = await loop.run_in_executor(
+                        scoring_executor, score_patient_matrix, snapshot, valid_features
+                    )
+            else:
+                async with secure_limiter.slot():
+                    results = await predict_diabetes_batch(valid_features)
+                # Patients scored one by one fail on their own; report them like invalid rows
+                probabilities[valid] = [
+                    np.nan if isinstance(result, Exception) else result for result in results
+                ]
+    except Overloaded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    headers = {"X-Invalid-Rows": str(int(np.isnan(probabilities).sum()))}
+    if content_type.startswith(NPY_MEDIA_TYPE):
+        return Response(write_npy(probabilities), media_type=NPY_MEDIA_TYPE, headers=headers)
+    return Response(write_arrow(probabilities), media_type=ARROW_MEDIA_TYPE, headers=headers)
+
+# Background warmup of the Nillion sessions, and whether it has succeeded
+_nillion_warmup_task = None
+_nillion_sessions_warm = False
+
+async def warm_nillion_pool():
+    """Open the shared Nillion sessions, retrying until the network is reachable"""
+    global _nillion_sessions_warm
+    while True:
+        try:
+            await nillion_pool.start()
+            _nillion_sessions_warm = True
+            return
+        except Exception as e:
+            print(f"Nillion session warmup failed, sessions will be created on demand "
+                  f"(retrying in {NILLION_WARMUP_RETRY_SECONDS}s): {e}")
+        await asyncio.sleep(NILLION_WARMUP_RETRY_SECONDS)
+
+@app.on_event("startup")
+async def warm_nillion_sessions():
+    """Refresh the preloaded model, resume interrupted training jobs, start TTL renewal and open Nillion sessions"""
+    global _nillion_warmup_task
+    # A worker forked from the preloaded master may hold a model trained over since
+    model_registry.refresh()
+    for job in training_jobs.interrupted():
+        print(f"Resuming interrupted training job {job['job_id']}")
+        start_training_job(job)
+    model_ttl_renewer.start()
+    if NILLION_POOL_WARMUP:
+        _nillion_warmup_task = asyncio.create_task(warm_nillion_pool())
+
+@app.on_event("shutdown")
+async def close_nillion_sessions():
+    """Release the shared Nillion sessions, the training process pool and the scoring threads"""
+    await model_ttl_renewer.stop()
+    if _nillion_warmup_task is not None:
+        _nillion_warmup_task.cancel()
+    await nillion_pool.close()
+    if _training_executor is not None:
+        _training_executor.shutdown(wait=False)
+    scoring_executor.shutdown(wait=False)
+
+@app.exception_handler(Overloaded)
+async def shed_request(request: Request, exc: Overloaded):
+    """Answer a shed prediction right away with a retry hint"""
+    requests_shed_total.inc(path=exc.path, status=exc.status_code)
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
 @app.get("/health")
 async def health_check():
     """API health check endpoint"""
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/ready")
+async def readiness_check():
+    """Ready once the model is loaded and, when warmup is enabled, the Nillion sessions are open"""
+    if model_registry.loaded:
+        model_state = "loaded"
+    elif not (os.path.exists(ARTIFACT_PATH) or os.path.exists(MODEL_PATH)):
+        # Nothing to warm yet; the service must stay reachable so it can be trained
+        model_state = "not trained"
+    else:
+        model_state = "loading"
+    nillion_state = ("warm" if _nillion_sessions_warm else "warming") if NILLION_POOL_WARMUP else "disabled"
+
+    body = {"model": model_state, "nillion_sessions": nillion_state}
+    if model_state != "loading" and nillion_state != "warming":
+        return {"status": "ready", **body}
+    return JSONResponse(status_code=503, content={"status": "not ready", **body})
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics for the prediction, training and Nillion upload pipelines"""
+    body = render_metrics([
+        stage_seconds, predictions_total, training_jobs_total, nillion_uploads_total, prediction_cache_total,
+        requests_shed_total,
+    ])
+    return Response(body, media_type=METRICS_CONTENT_TYPE)
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""Benchmark worker cold start: app import time and time to the first local prediction
+
+Each run starts a fresh interpreter in the backend directory, imports app and
+serves one local /predict through the route function, with the model preloaded
+at import time (as under gunicorn --preload) and without.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PARSER = argparse.ArgumentParser()
+PARSER.add_argument(
+    "--repeat",
+    dest="repeat",
+    type=int,
+    default=5,
+    help="Number of fresh interpreters per configuration",
+)
+ARGS = PARSER.parse_args()
+
+CHILD = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+heavy = [name for name in ("pandas", "scipy", "sklearn") if name in sys.modules]
+patient = app.PatientData(
+    Pregnancies=6, Glucose=148, BloodPressure=72, SkinThickness=35,
+    Insulin=0, BMI=33.6, DiabetesPedigreeFunction=0.627, Age=50,
+)
+asyncio.run(app.predict(patient))
+predicted = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - start,
+    "first_prediction_s": predicted - imported,
+    "heavy_modules_after_import": heavy,
+}))
+"""
+
+
+def run_child(preload):
+    env = dict(os.environ, MODEL_PRELOAD="true" if preload else "false", NILLION_POOL_WARMUP="false",
+               PYTHONWARNINGS="ignore")
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(repeat):
+    for preload in (True, False):
+        runs = [run_child(preload) for _ in range(repeat)]
+        label = "preloaded at import" if preload else "loaded on first request"
+        print(f"Model {label} (median of {repeat} runs):")
+        for key in ("import_s", "first_prediction_s"):
+            print(f"  {key:<22} {statistics.median(run[key] for run in runs) * 1000:9.1f} ms")
+        print(f"  imported by app import {', '.join(runs[-1]['heavy_modules_after_import']) or 'none of pandas/scipy/sklearn'}")
+
+
+if __name__ == "__main__":
+    main(ARGS.repeat)
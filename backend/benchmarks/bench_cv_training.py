@@ -0,0 +1,76 @@
+"""Benchmark wall-clock scaling of the cross-validated grid search with pool size
+
+Fits the configured grid (grid_training.DEFAULT_GRID unless CV_GRID is set) on
+the base dataset plus --rows resampled rows, once per worker count, and
+reports the speedup and parallel efficiency relative to one worker.
+
+    python benchmarks/bench_cv_training.py --workers 1,2,4,8 --rows 20000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+import dataset
+import grid_training
+from config import FEATURE_COLUMNS
+
+PARSER = argparse.ArgumentParser()
+PARSER.add_argument(
+    "--workers",
+    dest="workers",
+    default=",".join(str(2 ** i) for i in range(8) if 2 ** i <= (os.cpu_count() or 1)),
+    help="Comma-separated pool sizes to time (default: powers of two up to the core count)",
+)
+PARSER.add_argument(
+    "--rows",
+    dest="rows",
+    type=int,
+    default=20000,
+    help="Resampled rows added to the base dataset",
+)
+PARSER.add_argument(
+    "--no-prune",
+    dest="prune",
+    action="store_false",
+    help="Evaluate every candidate on every fold",
+)
+ARGS = PARSER.parse_args()
+
+
+def main(args):
+    work_dir = tempfile.mkdtemp(prefix="diabetes-cv-bench-")
+    dataset.BASE_DATASET_CACHE = os.path.join(work_dir, "diabetes_base.npy")
+    grid_training.CV_RESULTS_PATH = os.path.join(work_dir, "cv_results.json")
+
+    # Resample the base rows with a little multiplicative noise
+    base = pd.read_csv(dataset.BASE_DATASET_CSV)
+    rng = np.random.default_rng(0)
+    extra = base.iloc[rng.integers(0, len(base), args.rows)].astype(np.float64).reset_index(drop=True)
+    extra[FEATURE_COLUMNS] *= rng.normal(1.0, 0.02, (args.rows, len(FEATURE_COLUMNS)))
+    csv_path = os.path.join(work_dir, "extra.csv")
+    extra.to_csv(csv_path, index=False)
+    dataset.load_training_dataset(csv_path)  # ingest once so only the search is timed
+
+    candidates = len(grid_training.expand_grid(grid_training.configured_grid()))
+    print(f"{candidates} candidates x {grid_training.CV_FOLDS} folds on {len(base) + args.rows} rows")
+    baseline = None
+    for workers in [int(count) for count in args.workers.split(",")]:
+        start = time.perf_counter()
+        grid_training.fit_cv_model(csv_path, workers=workers, prune_margin=None if args.prune else 1.0)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed * workers
+        speedup = baseline / elapsed
+        print(f"  {workers:>3} workers  {elapsed:7.2f} s  speedup {speedup:5.2f}x  "
+              f"efficiency {speedup / workers:6.1%}")
+
+
+if __name__ == "__main__":
+    main(ARGS)
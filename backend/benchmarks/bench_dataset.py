@@ -0,0 +1,61 @@
+"""Benchmark cold and warm dataset loading and training"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dataset
+from app import fit_diabetes_model
+
+PARSER = argparse.ArgumentParser()
+PARSER.add_argument(
+    "--repeat",
+    dest="repeat",
+    type=int,
+    default=5,
+    help="Number of timed runs per measurement",
+)
+ARGS = PARSER.parse_args()
+
+
+def best_of(repeat, setup, run):
+    """Return the fastest of `repeat` timed runs of run(), calling setup() before each"""
+    timings = []
+    for _ in range(repeat):
+        setup()
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(repeat):
+    cache_dir = tempfile.mkdtemp(prefix="diabetes-cache-")
+    dataset.BASE_DATASET_CACHE = os.path.join(cache_dir, "diabetes_base.npy")
+
+    def drop_cache():
+        if os.path.exists(dataset.BASE_DATASET_CACHE):
+            os.remove(dataset.BASE_DATASET_CACHE)
+
+    def keep_cache():
+        dataset.load_base_dataset()
+
+    results = {
+        "load (cold, parse CSV + write cache)": best_of(repeat, drop_cache, dataset.load_base_dataset),
+        "load (warm, memory-mapped cache)": best_of(repeat, keep_cache, dataset.load_base_dataset),
+        "train (cold)": best_of(repeat, drop_cache, fit_diabetes_model),
+        "train (warm)": best_of(repeat, keep_cache, fit_diabetes_model),
+    }
+
+    print(f"Best of {repeat} runs:")
+    for name, seconds in results.items():
+        print(f"  {name:<40} {seconds * 1000:9.3f} ms")
+    return results
+
+
+if __name__ == "__main__":
+    main(ARGS.repeat)
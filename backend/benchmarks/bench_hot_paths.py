@@ -0,0 +1,213 @@
+"""Microbenchmarks for the local scoring and training hot paths
+
+Runs offline against backend/diabetes.csv and writes the timings as JSON.
+With --compare, the results are checked against a stored baseline and the
+script exits non-zero when any benchmark got slower than --threshold allows.
+
+    python benchmarks/bench_hot_paths.py --output baseline.json
+    python benchmarks/bench_hot_paths.py --compare baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+
+import dataset
+from app import PatientData, fit_diabetes_model, process_patient_data, score_patient_matrix
+from config import FEATURE_COLUMNS
+from model_registry import ModelRegistry, ModelSnapshot, atomic_dump, atomic_save_artifact
+
+PARSER = argparse.ArgumentParser()
+PARSER.add_argument(
+    "--repeat",
+    dest="repeat",
+    type=int,
+    default=5,
+    help="Number of timed runs per benchmark; the best and median are reported",
+)
+PARSER.add_argument(
+    "--sizes",
+    dest="sizes",
+    default="768,10000,100000",
+    help="Comma-separated dataset sizes (rows) for the training benchmarks",
+)
+PARSER.add_argument(
+    "--batch-rows",
+    dest="batch_rows",
+    type=int,
+    default=10000,
+    help="Rows scored by the batch scoring benchmark",
+)
+PARSER.add_argument(
+    "--output",
+    dest="output",
+    default=None,
+    help="Write results to this JSON file",
+)
+PARSER.add_argument(
+    "--compare",
+    dest="compare",
+    default=None,
+    help="Baseline JSON file to compare the results against",
+)
+PARSER.add_argument(
+    "--threshold",
+    dest="threshold",
+    type=float,
+    default=0.10,
+    help="Relative slowdown against the baseline that counts as a regression",
+)
+ARGS = PARSER.parse_args()
+
+
+def measure(run, repeat, setup=None, number=None):
+    """Time run() `repeat` times and return per-call seconds
+
+    Fast calls are looped `number` times per timed run (picked by
+    timeit.autorange when not given) so timer resolution does not dominate.
+    """
+    if number is None:
+        number = 1 if setup is not None else timeit.Timer(run).autorange()[0]
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        timings.append((time.perf_counter() - start) / number)
+    return {
+        "best_s": min(timings),
+        "median_s": statistics.median(timings),
+        "calls_per_run": number,
+        "runs": repeat,
+    }
+
+
+def synthetic_dataset(base, rows, seed=0):
+    """Resample the base rows with a little multiplicative noise up to `rows` rows"""
+    rng = np.random.default_rng(seed)
+    picked = base.iloc[rng.integers(0, len(base), rows)].astype(np.float64).reset_index(drop=True)
+    picked[FEATURE_COLUMNS] *= rng.normal(1.0, 0.02, (rows, len(FEATURE_COLUMNS)))
+    return picked
+
+
+def main(args):
+    work_dir = tempfile.mkdtemp(prefix="diabetes-bench-")
+    dataset.BASE_DATASET_CACHE = os.path.join(work_dir, "diabetes_base.npy")
+    base = pd.read_csv(dataset.BASE_DATASET_CSV)
+
+    model, scaler, _, kernel = fit_diabetes_model()
+    snapshot = ModelSnapshot(0, model, scaler, kernel)
+    model_path = os.path.join(work_dir, "diabetes_classifier.joblib")
+    scaler_path = os.path.join(work_dir, "diabetes_scaler.joblib")
+    atomic_dump(model, model_path)
+    atomic_dump(scaler, scaler_path)
+    artifact_path = os.path.join(work_dir, "diabetes_model.bin")
+    atomic_save_artifact(artifact_path, 1, model, scaler, kernel)
+
+    row = base[FEATURE_COLUMNS].iloc[0]
+    patient = PatientData(**{col: float(row[col]) for col in FEATURE_COLUMNS})
+    as_dict = {col: float(row[col]) for col in FEATURE_COLUMNS}
+    as_list = [float(row[col]) for col in FEATURE_COLUMNS]
+    as_csv = ",".join(str(value) for value in as_list)
+    features = process_patient_data(patient)
+    matrix = synthetic_dataset(base, args.batch_rows)[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+
+    results = {
+        "process_patient_data (pydantic)": measure(lambda: process_patient_data(patient), args.repeat),
+        "process_patient_data (dict)": measure(lambda: process_patient_data(as_dict), args.repeat),
+        "process_patient_data (list)": measure(lambda: process_patient_data(as_list), args.repeat),
+        "process_patient_data (csv string)": measure(lambda: process_patient_data(as_csv), args.repeat),
+        "score single row (fused kernel)": measure(lambda: kernel.predict_proba(features), args.repeat),
+        "score single row (sklearn)": measure(
+            lambda: model.predict_proba(scaler.transform(features.reshape(1, -1))), args.repeat
+        ),
+        f"score batch of {args.batch_rows} (fused kernel)": measure(
+            lambda: score_patient_matrix(snapshot, matrix), args.repeat
+        ),
+        "joblib load (model + scaler)": measure(
+            lambda: (joblib.load(model_path), joblib.load(scaler_path)), args.repeat
+        ),
+        "registry load (mapped artifact)": measure(
+            lambda: ModelRegistry(artifact_path, model_path, scaler_path).load(), args.repeat
+        ),
+    }
+
+    for size in [int(size) for size in args.sizes.split(",")]:
+        # Uploads are added on top of the base rows, so generate the difference
+        csv_path = os.path.join(work_dir, f"synthetic_{size}.csv")
+        synthetic_dataset(base, max(size - len(base), 0), seed=size).to_csv(csv_path, index=False)
+        fit_diabetes_model(csv_path)  # ingest the upload once so only training is timed
+        results[f"train ({size} rows)"] = measure(
+            lambda: fit_diabetes_model(csv_path), args.repeat, number=1
+        )
+
+    return {
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "sklearn": sklearn.__version__,
+            "machine": platform.machine(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(report, baseline, threshold):
+    """Print the change of each benchmark against the baseline; return the regressed names"""
+    regressions = []
+    print(f"{'benchmark':<45} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, current in report["results"].items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            print(f"{name:<45} {'-':>12} {current['best_s'] * 1e6:10.1f}us {'new':>8}")
+            continue
+        change = current["best_s"] / previous["best_s"] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(
+            f"{name:<45} {previous['best_s'] * 1e6:10.1f}us {current['best_s'] * 1e6:10.1f}us "
+            f"{change:+8.1%}{flag}"
+        )
+    return regressions
+
+
+def print_report(report):
+    print(f"Best and median of {report['meta']['repeat']} runs (per call):")
+    for name, result in report["results"].items():
+        print(f"  {name:<45} {result['best_s'] * 1e6:12.1f} us {result['median_s'] * 1e6:12.1f} us")
+
+
+if __name__ == "__main__":
+    report = main(ARGS)
+    if ARGS.output:
+        with open(ARGS.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+
+    if ARGS.compare:
+        with open(ARGS.compare, "r") as baseline_file:
+            regressions = compare(report, json.load(baseline_file), ARGS.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed by more than {ARGS.threshold:.0%}")
+            sys.exit(1)
+    else:
+        print_report(report)
@@ -0,0 +1,136 @@
+"""Mixed local/secure load test for the /predict admission limits
+
+Runs the app in-process against the local Nillion stand-in (nillion_local.py)
+and drives it with closed-loop clients: many secure clients flooding the
+slow path while a few local clients and a health checker measure latency.
+Shed clients wait for the Retry-After hint before trying again.
+Each scenario runs once with the configured limits and once with the limits
+lifted, and reports latency percentiles and how many secure requests were
+shed with 429/503.
+
+    python benchmarks/bench_mixed_load.py --secure-clients 200 --duration 10
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+# Run on a copy of the trained model so the stand-in's provider_info.json never touches the real one
+WORK_DIR = tempfile.mkdtemp(prefix="diabetes-load-")
+shutil.copytree(os.path.join(BACKEND_DIR, "model"), os.path.join(WORK_DIR, "model"), ignore=shutil.ignore_patterns(
+    "jobs", "provider_info.json"
+))
+os.chdir(WORK_DIR)
+os.environ.setdefault("NILLION_NETWORK", "local")
+os.environ.setdefault("NILLION_LOCAL_LATENCY", "default=0.02,compute=0.5")
+os.environ.setdefault("NILLION_POOL_WARMUP", "false")
+
+PARSER = argparse.ArgumentParser()
+PARSER.add_argument(
+    "--secure-clients",
+    dest="secure_clients",
+    type=int,
+    default=200,
+    help="Concurrent clients sending secure predictions",
+)
+PARSER.add_argument(
+    "--local-clients",
+    dest="local_clients",
+    type=int,
+    default=8,
+    help="Concurrent clients sending local predictions",
+)
+PARSER.add_argument(
+    "--duration",
+    dest="duration",
+    type=float,
+    default=10.0,
+    help="Seconds per scenario",
+)
+ARGS = PARSER.parse_args()
+
+import httpx
+
+import app
+
+PATIENT = {
+    "Pregnancies": 6, "Glucose": 148, "BloodPressure": 72, "SkinThickness": 35,
+    "Insulin": 0, "BMI": 33.6, "DiabetesPedigreeFunction": 0.627, "Age": 50,
+}
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def client_loop(client, method, url, body, deadline, latencies, statuses):
+    """Send requests back to back until the deadline, recording successful latencies and status codes"""
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.request(method, url, json=body)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        if response.status_code in (429, 503):
+            # Honour the hint, but never sleep past the end of the scenario
+            retry_after = float(response.headers.get("retry-after", "1"))
+            await asyncio.sleep(max(0.0, min(retry_after, deadline - time.perf_counter())))
+            continue
+        latencies.append(time.perf_counter() - start)
+        # In-process requests may never suspend; give the other clients a turn as a socket would
+        await asyncio.sleep(0)
+
+
+async def run_scenario(args):
+    transport = httpx.ASGITransport(app=app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        deadline = time.perf_counter() + args.duration
+        results = {name: ([], {}) for name in ("local", "secure", "health")}
+        loops = [
+            client_loop(client, "POST", "/predict", dict(PATIENT, use_local=True), deadline, *results["local"])
+            for _ in range(args.local_clients)
+        ]
+        loops += [
+            client_loop(client, "POST", "/predict", dict(PATIENT, use_local=False), deadline, *results["secure"])
+            for _ in range(args.secure_clients)
+        ]
+        loops.append(client_loop(client, "GET", "/health", None, deadline, *results["health"]))
+        await asyncio.gather(*loops)
+    return results
+
+
+def report(label, results):
+    print(f"{label} (latency of answered requests):")
+    for name, (latencies, statuses) in results.items():
+        counts = "  ".join(f"{status}: {count}" for status, count in sorted(statuses.items()))
+        print(f"  {name:<7} p50 {percentile(latencies, 0.5) * 1000:8.1f} ms  "
+              f"p99 {percentile(latencies, 0.99) * 1000:8.1f} ms  "
+              f"mean {statistics.fmean(latencies) * 1000 if latencies else float('nan'):8.1f} ms  {counts}")
+
+
+async def main(args):
+    snapshot = app.model_registry.current()
+    if snapshot is None:
+        sys.exit("No trained model in backend/model; train one first")
+    await app.store_model_on_nillion(snapshot)
+
+    report("configured limits", await run_scenario(args))
+
+    for limiter in (app.local_limiter, app.secure_limiter):
+        limiter.max_concurrent = limiter.max_queued = 1_000_000
+        limiter.max_wait = None
+        limiter._slots = None
+    report("limits lifted", await run_scenario(args))
+    await app.nillion_pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(ARGS))
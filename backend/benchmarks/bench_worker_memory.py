@@ -0,0 +1,120 @@
+"""Benchmark per-worker memory with the mapped model bundle versus unpickled joblib models
+
+Imports app once in a parent process (as gunicorn --preload does in the master)
+and forks --workers children. Each child loads the model the way a worker does,
+scores --rows patients and reports its proportional (PSS) and private (USS)
+memory from /proc/self/smaps_rollup, so Linux only. The joblib baseline pickles
+the served model and scaler to a temporary directory, as releases before the
+bundle stored them.
+
+    python benchmarks/bench_worker_memory.py --workers 1,2,4,8
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.chdir(BACKEND_DIR)
+os.environ.setdefault("MODEL_PRELOAD", "false")
+os.environ.setdefault("NILLION_POOL_WARMUP", "false")
+
+PARSER = argparse.ArgumentParser()
+PARSER.add_argument(
+    "--workers",
+    dest="workers",
+    default="1,2,4,8",
+    help="Comma-separated worker counts to fork",
+)
+PARSER.add_argument(
+    "--rows",
+    dest="rows",
+    type=int,
+    default=1000,
+    help="Patients scored one at a time by each worker before measuring",
+)
+ARGS = PARSER.parse_args()
+
+import joblib
+import numpy as np
+
+import app
+from config import DIM
+
+
+def memory_kib():
+    """(PSS, USS) of the calling process in KiB"""
+    fields = {}
+    with open("/proc/self/smaps_rollup") as smaps:
+        for line in smaps:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return fields["Pss"], fields["Private_Clean"] + fields["Private_Dirty"]
+
+
+def serve(mode, rows, preloaded, pickles, barrier, results):
+    """Score rows one by one as a worker of the given mode, then report memory once all workers are up"""
+    patients = np.random.default_rng(0).uniform(0, 150, (rows, DIM))
+    if mode == "artifact":
+        for patient in patients:
+            app.model_registry.current().kernel.predict_proba(patient)
+    else:
+        model, scaler = preloaded or tuple(joblib.load(path) for path in pickles)
+        for patient in patients:
+            model.predict_proba(scaler.transform(patient.reshape(1, -1)))
+    barrier.wait()
+    results.put(memory_kib())
+    # Stay alive (and keep sharing pages) until every worker has measured
+    barrier.wait()
+
+
+def fork_workers(mode, count, rows, pickles, preloaded=None):
+    """Fork count workers that serve concurrently and return their (PSS, USS) readings"""
+    context = multiprocessing.get_context("fork")
+    barrier = context.Barrier(count)
+    results = context.Queue()
+    workers = [
+        context.Process(target=serve, args=(mode, rows, preloaded, pickles, barrier, results))
+        for _ in range(count)
+    ]
+    for worker in workers:
+        worker.start()
+    readings = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    return readings
+
+
+def main(args):
+    snapshot = app.model_registry.current()
+    if snapshot is None:
+        sys.exit("No trained model in backend/model; train one first")
+    work_dir = tempfile.mkdtemp(prefix="bench-worker-memory-")
+    pickles = (os.path.join(work_dir, "diabetes_classifier.joblib"), os.path.join(work_dir, "diabetes_scaler.joblib"))
+    joblib.dump(snapshot.model.to_estimator(), pickles[0])
+    joblib.dump(snapshot.scaler.to_estimator(), pickles[1])
+    # The map is redone in each worker, like a worker forked before the first request
+    app.model_registry._snapshot = None
+    configurations = [
+        ("joblib, loaded per worker", "joblib", None),
+        ("joblib, preloaded in master", "joblib", tuple(joblib.load(path) for path in pickles)),
+        ("mapped bundle", "artifact", None),
+    ]
+
+    for label, mode, preloaded in configurations:
+        print(f"{label}:")
+        for count in [int(count) for count in args.workers.split(",")]:
+            readings = fork_workers(mode, count, args.rows, pickles, preloaded)
+            pss = sum(reading[0] for reading in readings)
+            uss = statistics.median(reading[1] for reading in readings)
+            print(f"  {count:>2} workers  total PSS {pss / 1024:7.1f} MiB  "
+                  f"median private per worker {uss / 1024:5.1f} MiB")
+
+
+if __name__ == "__main__":
+    main(ARGS)
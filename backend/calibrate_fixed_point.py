@@ -0,0 +1,134 @@
+"""Pick the cheapest fixed-point precision that keeps secure predictions within a tolerance
+
+Simulates the SecretRational forward pass of src/diabetes_prediction.py in
+integer NumPy for every combination of log scale and prime size, compares the
+decoded probabilities with the float model on a dataset and writes the
+cheapest passing setting (smallest prime, then fewest fractional bits) to
+model/fixed_point.json and into the model bundle. Rebuild the Nada programs
+and store the model again afterwards; the store records the setting in
+provider_info.json.
+
+    python calibrate_fixed_point.py --tolerance 1e-3 --apply
+"""
+
+import argparse
+import glob
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import FEATURE_COLUMNS
+from fixed_point import (FIXED_POINT_PATH, PRIME_SIZES, FixedPoint, decode_probability,
+                         load_compiled_fixed_point, required_prime_bits, simulate_logits)
+from fused_kernel import sigmoid
+from model_registry import ModelRegistry, atomic_write_json
+
+PARSER = argparse.ArgumentParser()
+PARSER.add_argument(
+    "--data-path",
+    dest="data_path",
+    type=str,
+    default="diabetes.csv",
+    help="CSV with the feature columns to calibrate on",
+)
+PARSER.add_argument(
+    "--tolerance",
+    dest="tolerance",
+    type=float,
+    default=1e-3,
+    help="Largest acceptable absolute probability error against the float model",
+)
+PARSER.add_argument(
+    "--log-scales",
+    dest="log_scales",
+    default="4,6,8,10,12,14,16,20,24,32",
+    help="Comma-separated numbers of fractional bits to try",
+)
+PARSER.add_argument(
+    "--apply",
+    dest="apply",
+    action="store_true",
+    help="Also set prime_size in nada-project.toml to the chosen value",
+)
+ARGS = PARSER.parse_args()
+
+
+def evaluate(features_scaled, model, log_scale, reference):
+    """Error of the simulated secure path at one log scale, and the field size it needs"""
+    logits, largest = simulate_logits(features_scaled, model.coef_, model.intercept_, log_scale)
+    probabilities = decode_probability(np.asarray(logits, dtype=np.float64), log_scale)
+    errors = np.abs(probabilities - reference)
+    return {
+        "log_scale": log_scale,
+        "max_probability_error": float(errors.max()),
+        "mean_probability_error": float(errors.mean()),
+        "decision_flips": int(np.sum((probabilities > 0.5) != (reference > 0.5))),
+        "required_prime_bits": required_prime_bits(largest),
+    }
+
+
+def set_project_prime_size(prime_size, path="nada-project.toml"):
+    """Point every program in the Nada project at the chosen prime size"""
+    with open(path, "r") as project_file:
+        project = project_file.read()
+    with open(path, "w") as project_file:
+        project_file.write(re.sub(r"(?m)^prime_size = \d+$", f"prime_size = {prime_size}", project))
+
+
+def main(args):
+    registry = ModelRegistry(
+        "model/diabetes_model.bin", "model/diabetes_classifier.joblib", "model/diabetes_scaler.joblib"
+    )
+    snapshot = registry.load()
+    if snapshot is None:
+        sys.exit("No trained model found; run train_model.py first")
+
+    features = pd.read_csv(args.data_path)[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    features_scaled = snapshot.scaler.transform(features)
+    reference = sigmoid(features_scaled @ snapshot.model.coef_[0] + snapshot.model.intercept_[0])
+    current = snapshot.fixed_point
+    print(f"Calibrating on {len(features)} rows from {args.data_path}, tolerance {args.tolerance:g} "
+          f"(currently log_scale={current.log_scale}, prime_size={current.prime_size})")
+
+    results = []
+    for log_scale in sorted(int(scale) for scale in args.log_scales.split(",")):
+        result = evaluate(features_scaled, snapshot.model, log_scale, reference)
+        print(f"  log_scale {log_scale:>2}: max error {result['max_probability_error']:.2e}  "
+              f"mean error {result['mean_probability_error']:.2e}  flips {result['decision_flips']:>3}  "
+              f"needs a {result['required_prime_bits']}-bit prime")
+        results.append(result)
+
+    # Cheapest first: the prime size sets the cost of every field operation
+    chosen = next(
+        (dict(result, prime_size=prime_size) for prime_size in PRIME_SIZES for result in results
+         if result["required_prime_bits"] <= prime_size and result["max_probability_error"] <= args.tolerance),
+        None,
+    )
+    if chosen is None:
+        sys.exit(f"No setting keeps the probability error within {args.tolerance:g}")
+
+    record = dict(chosen, tolerance=args.tolerance, rows=len(features), calibrated_at=time.time())
+    atomic_write_json(record, FIXED_POINT_PATH)
+    registry.restore(registry.artifact_path, FixedPoint(chosen["log_scale"], chosen["prime_size"]))
+    print(f"Chose log_scale={chosen['log_scale']}, prime_size={chosen['prime_size']} "
+          f"(max error {chosen['max_probability_error']:.2e}); wrote {FIXED_POINT_PATH} and {registry.artifact_path}")
+
+    # Uploads are refused until the compiled programs match the new scale
+    stale = [path for path in sorted(glob.glob("target/*.nada.bin"))
+             if load_compiled_fixed_point(path).log_scale != chosen["log_scale"]]
+    if stale:
+        print(f"{', '.join(stale)} compiled with a different log_scale; the model cannot be stored until they are rebuilt")
+
+    if args.apply:
+        set_project_prime_size(chosen["prime_size"])
+        print("Updated nada-project.toml; rebuild the programs and store the model again")
+    else:
+        print(f"Set prime_size = {chosen['prime_size']} in nada-project.toml (or rerun with --apply), "
+              "then rebuild the programs and store the model again")
+
+
+if __name__ == "__main__":
+    main(ARGS)
@@ -0,0 +1,104 @@
+"""NPY and Arrow IPC encodings of patient feature matrices for bulk scoring
+
+Requests carry an (N, DIM) float matrix in FEATURE_COLUMNS order and are read
+without copying where the format allows; responses carry one probability per
+row in the same format. pyarrow is a requirement, but it is only imported for
+Arrow bodies so workers that never see one do not load it.
+"""
+
+import io
+
+import numpy as np
+
+from config import DIM, FEATURE_COLUMNS
+
+NPY_MEDIA_TYPE = "application/x-npy"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PROBABILITY_COLUMN = "diabetes_probability"
+
+
+class UnsupportedFormatError(ValueError):
+    """The body cannot be decoded in this deployment (e.g. pyarrow is not installed)"""
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc  # noqa: F401
+    except ImportError:
+        raise UnsupportedFormatError("Arrow IPC bodies require pyarrow to be installed")
+    return pa
+
+
+def read_npy_matrix(body):
+    """View an .npy body as an (N, DIM) float matrix without copying the data"""
+    header = io.BytesIO(body)
+    version = np.lib.format.read_magic(header)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(header)
+    elif version == (2, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(header)
+    else:
+        raise ValueError(f"Unsupported .npy version {version}")
+
+    if len(shape) != 2 or shape[1] != DIM:
+        raise ValueError(f"Expected an (N, {DIM}) matrix, got shape {shape}")
+    if dtype not in (np.dtype("<f4"), np.dtype("<f8"), np.dtype(">f4"), np.dtype(">f8")):
+        raise ValueError(f"Expected float32 or float64 values, got {dtype}")
+
+    count = shape[0] * shape[1]
+    data = np.frombuffer(body, dtype=dtype, count=count, offset=header.tell())
+    if fortran_order:
+        return data.reshape(shape[::-1]).T
+    return data.reshape(shape)
+
+
+def write_npy(array):
+    """Encode an array as an .npy body"""
+    buffer = io.BytesIO()
+    np.save(buffer, np.ascontiguousarray(array), allow_pickle=False)
+    return buffer.getvalue()
+
+
+def read_arrow_matrix(body):
+    """Read an Arrow IPC stream with one float column per feature into an (N, DIM) matrix
+
+    Columns are matched by FEATURE_COLUMNS name when present, otherwise taken in
+    order. Single-chunk, null-free columns are viewed without copying before
+    they are laid out as the matrix.
+    """
+    pa = _import_pyarrow()
+    table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+    if table.num_columns != DIM:
+        raise ValueError(f"Expected {DIM} feature columns, got {table.num_columns}")
+
+    names = FEATURE_COLUMNS if all(col in table.column_names for col in FEATURE_COLUMNS) else table.column_names
+    matrix = np.empty((table.num_rows, DIM), dtype=np.float64)
+    for index, name in enumerate(names):
+        column = table.column(name)
+        if not pa.types.is_floating(column.type) and not pa.types.is_integer(column.type):
+            raise ValueError(f"Column {name} must be numeric, got {column.type}")
+        # Nulls become NaN and are rejected by validate_features
+        column = column.combine_chunks() if column.num_chunks != 1 else column.chunk(0)
+        matrix[:, index] = column.to_numpy(zero_copy_only=False)
+    return matrix
+
+
+def write_arrow(probabilities):
+    """Encode per-row probabilities as an Arrow IPC stream with one float64 column"""
+    pa = _import_pyarrow()
+    table = pa.table({PROBABILITY_COLUMN: pa.array(probabilities, type=pa.float64())})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def validate_features(features):
+    """Boolean mask of rows whose features are all finite and non-negative
+
+    Every feature of the diabetes dataset is a count or a measurement, so
+    negative values are as invalid as NaN or infinity.
+    """
+    with np.errstate(invalid="ignore"):
+        return np.isfinite(features).all(axis=1) & (features >= 0).all(axis=1)
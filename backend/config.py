@@ -1,3 +1,13 @@
 # config.py - Configuration file for diabetes prediction model
 # Number of features in the diabetes dataset
-DIM = 8  # 8 features: Pregnancies, Glucose, BloodPressure, SkinThickness, Insulin, BMI, DiabetesPedigreeFunction, Age
\ No newline at end of file
+DIM = 8  # 8 features: Pregnancies, Glucose, BloodPressure, SkinThickness, Insulin, BMI, DiabetesPedigreeFunction, Age
+
+# Feature order used everywhere a patient is turned into a vector
+FEATURE_COLUMNS = [
+    'Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness',
+    'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age'
+]
+TARGET_COLUMN = 'Outcome'
+
+# Number of patients scored by one invocation of the batched program (src/diabetes_prediction_batch.py)
+BATCH_SIZE = 8
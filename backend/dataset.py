@@ -0,0 +1,144 @@
+"""Training data: the cached base dataset, uploads and the append-only training store"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from config import FEATURE_COLUMNS, TARGET_COLUMN
+from model_registry import atomic_save_npy
+
+# Feature columns followed by the outcome, in the order stored in the cache
+DATASET_COLUMNS = FEATURE_COLUMNS + [TARGET_COLUMN]
+
+BASE_DATASET_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "diabetes.csv")
+BASE_DATASET_CACHE = "model/diabetes_base.npy"
+
+# Rows parsed per pandas chunk when ingesting uploads
+CSV_CHUNK_ROWS = int(os.getenv("CSV_CHUNK_ROWS", "50000"))
+
+
+def build_dataset_cache(csv_path=None, cache_path=None):
+    """Parse the base CSV once and store it as a float32 (N, DIM + 1) .npy file"""
+    csv_path = csv_path or BASE_DATASET_CSV
+    cache_path = cache_path or BASE_DATASET_CACHE
+    df = pd.read_csv(csv_path, usecols=DATASET_COLUMNS, dtype=np.float32)
+    data = np.ascontiguousarray(df[DATASET_COLUMNS].to_numpy(dtype=np.float32))
+    atomic_save_npy(data, cache_path)
+    return data
+
+
+def load_base_dataset(csv_path=None, cache_path=None):
+    """Return the base dataset as a read-only memory map, rebuilding the cache if the CSV changed"""
+    csv_path = csv_path or BASE_DATASET_CSV
+    cache_path = cache_path or BASE_DATASET_CACHE
+    if not os.path.exists(cache_path) or os.path.getmtime(cache_path) < os.path.getmtime(csv_path):
+        build_dataset_cache(csv_path, cache_path)
+
+    data = np.load(cache_path, mmap_mode="r")
+    if data.ndim != 2 or data.shape[1] != len(DATASET_COLUMNS):
+        # Stale layout from an older version of the cache
+        build_dataset_cache(csv_path, cache_path)
+        data = np.load(cache_path, mmap_mode="r")
+    return data
+
+
+def _parse_csv_chunks(csv_path, chunk_rows, pinned):
+    """Yield the valid float32 rows of each chunk of a CSV, in DATASET_COLUMNS order"""
+    options = {"usecols": DATASET_COLUMNS, "chunksize": chunk_rows}
+    if pinned:
+        # Parse straight to float32 instead of inferring int64/float64/object per column
+        options["dtype"] = {col: np.float32 for col in DATASET_COLUMNS}
+    with pd.read_csv(csv_path, **options) as reader:
+        for chunk in reader:
+            if not pinned:
+                chunk = chunk.apply(pd.to_numeric, errors="coerce")
+            data = chunk[DATASET_COLUMNS].to_numpy(dtype=np.float32)
+            yield data[np.isfinite(data).all(axis=1)]
+
+
+def ingest_custom_dataset(csv_path, rows_path, chunk_rows=None):
+    """Convert an uploaded CSV into a float32 row file chunk by chunk and return its row count
+
+    Columns are matched by name; rows with a missing or non-numeric value in
+    any required column are dropped. Memory use is bounded by chunk_rows, not
+    by the size of the upload.
+    """
+    chunk_rows = chunk_rows or CSV_CHUNK_ROWS
+    header = pd.read_csv(csv_path, nrows=0).columns
+    tmp_path = rows_path + ".partial"
+    rows = 0
+    with open(tmp_path, "wb") as rows_file:
+        # Without every required column there is no valid row to keep
+        if all(col in header for col in DATASET_COLUMNS):
+            try:
+                for data in _parse_csv_chunks(csv_path, chunk_rows, pinned=True):
+                    data.tofile(rows_file)
+                    rows += len(data)
+            except ValueError:
+                # A non-numeric value somewhere; start over and coerce it to NaN
+                rows_file.seek(0)
+                rows_file.truncate()
+                rows = 0
+                for data in _parse_csv_chunks(csv_path, chunk_rows, pinned=False):
+                    data.tofile(rows_file)
+                    rows += len(data)
+        rows_file.flush()
+        os.fsync(rows_file.fileno())
+    os.replace(tmp_path, rows_path)
+    return rows
+
+
+def load_custom_dataset(csv_path):
+    """Memory-map the valid rows of an uploaded CSV, ingesting it on first use"""
+    rows_path = os.path.splitext(csv_path)[0] + ".f32"
+    if not os.path.exists(rows_path) or os.path.getmtime(rows_path) < os.path.getmtime(csv_path):
+        ingest_custom_dataset(csv_path, rows_path)
+    return load_row_file(rows_path)
+
+
+def load_training_dataset(custom_data_path=None):
+    """Base dataset plus any uploaded rows, split into features and outcome"""
+    parts = [load_base_dataset()]
+    if custom_data_path and os.path.exists(custom_data_path):
+        parts.append(load_custom_dataset(custom_data_path))
+
+    # Fill the outputs part by part rather than concatenating float32 copies first
+    total = sum(len(part) for part in parts)
+    X = np.empty((total, len(FEATURE_COLUMNS)), dtype=np.float64)
+    y = np.empty(total, dtype=np.int64)
+    offset = 0
+    for part in parts:
+        X[offset:offset + len(part)] = part[:, :-1]
+        y[offset:offset + len(part)] = part[:, -1]
+        offset += len(part)
+    return X, y
+
+
+def load_row_file(path, rows=None):
+    """Memory-map the first `rows` rows of a float32 (N, DIM + 1) row file"""
+    if not os.path.exists(path):
+        return np.empty((0, len(DATASET_COLUMNS)), dtype=np.float32)
+    row_bytes = len(DATASET_COLUMNS) * np.dtype(np.float32).itemsize
+    available = os.path.getsize(path) // row_bytes
+    rows = available if rows is None else min(rows, available)
+    if rows == 0:
+        return np.empty((0, len(DATASET_COLUMNS)), dtype=np.float32)
+    return np.memmap(path, dtype=np.float32, mode="r", shape=(rows, len(DATASET_COLUMNS)))
+
+
+def append_row_file(path, data, committed_rows):
+    """Append float32 rows after the first `committed_rows` rows and return the new row count
+
+    Anything past `committed_rows` was left by an interrupted write and is discarded first.
+    """
+    row_bytes = len(DATASET_COLUMNS) * np.dtype(np.float32).itemsize
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "ab") as store_file:
+        store_file.truncate(committed_rows * row_bytes)
+        # data may be a memory map of a large upload; copy it over a chunk at a time
+        for start in range(0, len(data), CSV_CHUNK_ROWS):
+            np.ascontiguousarray(data[start:start + CSV_CHUNK_ROWS], dtype=np.float32).tofile(store_file)
+        store_file.flush()
+        os.fsync(store_file.fileno())
+    return committed_rows + len(data)
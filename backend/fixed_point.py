@@ -0,0 +1,123 @@
+"""Fixed-point precision shared by the Nada programs, their clients and the calibration tool
+
+SecretRational values are integers scaled by 2**log_scale in a prime field
+of prime_size bits. The Nada programs are compiled with the setting in
+model/fixed_point.json (written by calibrate_fixed_point.py) and record it
+next to their compiled target/<program>.nada.bin. The provider refuses to
+store a model encoded with any other scale, records the setting in
+provider_info.json when it stores the model, and patients encode inputs and
+decode logits with the recorded value, so all of them agree.
+"""
+
+import json
+import os
+from collections import namedtuple
+
+import numpy as np
+
+FixedPoint = namedtuple("FixedPoint", ["log_scale", "prime_size"])
+
+# nada_numpy's default SecretRational precision and the prime size in nada-project.toml
+DEFAULT_FIXED_POINT = FixedPoint(16, 128)
+FIXED_POINT_PATH = "model/fixed_point.json"
+# Prime sizes a Nada program can be compiled with
+PRIME_SIZES = (64, 128, 256)
+# Statistical security of probabilistic truncation: this many bits of the field stay unused
+STATISTICAL_SECURITY_BITS = 40
+
+
+def load_fixed_point(path=FIXED_POINT_PATH):
+    """The calibrated setting, or DEFAULT_FIXED_POINT if calibration was never run"""
+    if not os.path.exists(path):
+        return DEFAULT_FIXED_POINT
+    with open(path, "r") as fixed_point_file:
+        return fixed_point_from_dict(json.load(fixed_point_file))
+
+
+def fixed_point_from_dict(values):
+    """Read a setting as recorded in fixed_point.json or provider_info.json"""
+    if not values:
+        return DEFAULT_FIXED_POINT
+    return FixedPoint(int(values["log_scale"]), int(values["prime_size"]))
+
+
+def fixed_point_from_provider(provider_variables):
+    """Setting the stored model was encoded with; uploads predating the record used the default"""
+    return fixed_point_from_dict((provider_variables or {}).get("fixed_point"))
+
+
+def compiled_fixed_point_path(program_mir_path):
+    """Where the setting a program was compiled with is recorded: target/<program>.fixed_point.json"""
+    return program_mir_path[:-len(".nada.bin")] + ".fixed_point.json"
+
+
+def record_compiled_fixed_point(program_mir_path, fixed_point):
+    """Record the setting a program is being compiled with; called from the program's nada_main"""
+    path = compiled_fixed_point_path(program_mir_path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as record_file:
+        json.dump(fixed_point._asdict(), record_file)
+    os.replace(tmp_path, path)
+
+
+def load_compiled_fixed_point(program_mir_path):
+    """Setting a program was compiled with; programs built before it was recorded used the default"""
+    return load_fixed_point(compiled_fixed_point_path(program_mir_path))
+
+
+def check_compiled_fixed_point(program_mir_path, fixed_point):
+    """Raise ValueError if values encoded with fixed_point would be mis-scaled for a compiled program"""
+    compiled = load_compiled_fixed_point(program_mir_path)
+    if compiled.log_scale != fixed_point.log_scale:
+        raise ValueError(
+            f"{program_mir_path} was compiled with log_scale {compiled.log_scale}, but the model is encoded "
+            f"with log_scale {fixed_point.log_scale}; rebuild the programs (nada build) after calibrating"
+        )
+
+
+def decode_probability(logit_value, log_scale):
+    """Convert a fixed-point logit returned by a Nada program into a probability"""
+    return 1 / (1 + np.exp(-logit_value / 2**log_scale))
+
+
+def encode(values, log_scale):
+    """Round real values to fixed-point integers (Python ints, so no precision is lost)"""
+    return np.vectorize(lambda value: int(round(float(value) * 2**log_scale)), otypes=[object])(values)
+
+
+def simulate_logits(features_scaled, coef, intercept, log_scale, seed=0):
+    """Integer simulation of LogisticRegression.forward on SecretRational inputs
+
+    Mirrors src/diabetes_prediction.py: every product of an encoded weight and
+    an encoded feature carries 2 * log_scale fractional bits and is truncated
+    back to log_scale bits with probabilistic truncation (rounds down, or up
+    with probability equal to the dropped fraction), then the products and the
+    intercept are summed. Returns the fixed-point logits and the magnitude of
+    the largest intermediate value, which has to fit in the prime field.
+    """
+    rng = np.random.default_rng(seed)
+    products = encode(features_scaled, log_scale) * encode(np.asarray(coef).reshape(-1), log_scale)
+    largest = max(abs(int(value)) for value in products.ravel())
+
+    truncated = truncate_products(products, log_scale, rng)
+    logits = truncated.sum(axis=1) + encode(np.asarray(intercept).reshape(-1), log_scale)[0]
+    return logits, largest
+
+
+def truncate_products(products, log_scale, rng):
+    """Probabilistic truncation of fixed-point products from 2 * log_scale back to log_scale fractional bits
+
+    Each product is rounded down, or up with probability equal to the dropped
+    fraction, as nada_numpy does after every SecretRational multiplication.
+    """
+    products = np.asarray(products, dtype=object)
+    divisor = 2**log_scale
+    remainders = np.vectorize(lambda value: value % divisor, otypes=[object])(products)
+    carries = rng.random(products.shape) < np.asarray(remainders, dtype=np.float64) / divisor
+    return (products - remainders) // divisor + carries.astype(object)
+
+
+def required_prime_bits(largest):
+    """Field size needed for a signed intermediate of this magnitude plus the truncation margin"""
+    return int(largest).bit_length() + 1 + STATISTICAL_SECURITY_BITS
@@ -0,0 +1,49 @@
+"""Fused NumPy scoring kernel for the standardized logistic regression model"""
+
+import numpy as np
+
+
+class FusedKernel:
+    """Logistic regression with the StandardScaler folded into its weights
+
+    For a scaler with mean m and scale s and a model with weights w and
+    intercept b, w . ((x - m) / s) + b == (w / s) . x + (b - (w / s) . m), so
+    scoring raw features is a single dot product. The weights and intercept
+    are kept in one contiguous float64 array of length DIM + 1.
+    """
+
+    __slots__ = ("packed", "weights", "intercept")
+
+    def __init__(self, packed):
+        self.packed = np.ascontiguousarray(packed, dtype=np.float64)
+        self.weights = self.packed[:-1]
+        self.intercept = float(self.packed[-1])
+
+    @classmethod
+    def from_model(cls, model, scaler):
+        """Fold a fitted scaler's mean_/scale_ into the model's coef_/intercept_"""
+        weights = model.coef_[0] / scaler.scale_
+        intercept = model.intercept_[0] - np.dot(weights, scaler.mean_)
+        return cls(np.append(weights, intercept))
+
+    def decision_function(self, features):
+        """Return the logit for one feature vector or each row of a matrix"""
+        return np.asarray(features, dtype=np.float64) @ self.weights + self.intercept
+
+    def predict_proba(self, features):
+        """Return the probability of diabetes (class 1)"""
+        return sigmoid(self.decision_function(features))
+
+    def check_parity(self, model, scaler, features, atol=1e-9):
+        """Raise if the kernel disagrees with the sklearn scaler + model pipeline"""
+        expected = model.predict_proba(scaler.transform(features))[:, 1]
+        actual = self.predict_proba(features)
+        max_error = float(np.max(np.abs(expected - actual), initial=0.0))
+        if max_error > atol:
+            raise ValueError(f"Fused kernel deviates from the sklearn pipeline by {max_error:.3e}")
+        return max_error
+
+
+def sigmoid(logits):
+    """Numerically stable logistic function (no overflow for large |logit|)"""
+    return 0.5 * (1.0 + np.tanh(0.5 * logits))
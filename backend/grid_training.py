@@ -0,0 +1,214 @@
+"""Cross-validated hyperparameter search for the diabetes model on a process pool
+
+The holdout is the same 20% test split of the full dataset that the full
+trainer reports accuracy on. The remaining rows are split into CV_FOLDS
+stratified folds once; for every fold the rows are standardized with a scaler
+fitted on the other folds, and all fold matrices are written to a single
+memory-mapped file that every pool worker maps read-only, so no candidate
+rebuilds, rescales or copies them.
+
+Candidates are evaluated one fold per round, all candidates of a round in
+parallel. From the second round on, a candidate whose mean fold accuracy is
+more than CV_PRUNE_MARGIN below the leader's is dropped. The best candidate
+is refit on the whole training split and evaluated on the holdout.
+"""
+
+import itertools
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from dataset import load_training_dataset
+from fused_kernel import FusedKernel
+from model_registry import atomic_write_json
+
+CV_RESULTS_PATH = "model/cv_results.json"
+
+CV_FOLDS = int(os.getenv("CV_FOLDS", "5"))
+CV_WORKERS = int(os.getenv("CV_WORKERS", str(os.cpu_count() or 1)))
+CV_PRUNE_MARGIN = float(os.getenv("CV_PRUNE_MARGIN", "0.03"))
+# JSON object of parameter name -> list of values; unset keys keep DEFAULT_GRID's values
+CV_GRID = os.getenv("CV_GRID")
+
+DEFAULT_GRID = {
+    "C": [0.01, 0.03, 0.1, 0.3, 1.0, 3.0, 10.0, 100.0],
+    "penalty": ["l1", "l2"],
+    "solver": ["liblinear", "saga", "lbfgs"],
+    "class_weight": [None, "balanced"],
+}
+# Penalties each solver supports; other combinations are skipped
+SOLVER_PENALTIES = {
+    "liblinear": ("l1", "l2"),
+    "saga": ("l1", "l2"),
+    "lbfgs": ("l2",),
+    "newton-cg": ("l2",),
+    "sag": ("l2",),
+}
+MAX_ITER = 1000
+
+# Fold matrices mapped by each pool worker
+_folds = None
+
+
+def expand_grid(grid):
+    """Every valid combination of the grid's parameters, in a stable order"""
+    names = sorted(grid)
+    candidates = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        params = dict(zip(names, values))
+        if params.get("penalty", "l2") in SOLVER_PENALTIES.get(params.get("solver", "lbfgs"), ()):
+            candidates.append(params)
+    return candidates
+
+
+def configured_grid():
+    """DEFAULT_GRID with any parameters overridden by CV_GRID"""
+    grid = dict(DEFAULT_GRID)
+    if CV_GRID:
+        grid.update(json.loads(CV_GRID))
+    return grid
+
+
+# scikit-learn 1.8 deprecated `penalty` in favour of l1_ratio (0 is l2, 1 is l1)
+_PENALTY_DEPRECATED = LogisticRegression().penalty == "deprecated"
+
+
+def make_model(params):
+    params = dict(params)
+    if _PENALTY_DEPRECATED and "penalty" in params:
+        params["l1_ratio"] = 1.0 if params.pop("penalty") == "l1" else 0.0
+    return LogisticRegression(random_state=42, max_iter=MAX_ITER, **params)
+
+
+def write_folds(directory, X, y, folds):
+    """Standardize every fold and save the matrices the workers will map
+
+    Fold k occupies rows bounds[k][0]:bounds[k][2] of Z and y: its training
+    rows first, then from bounds[k][1] its validation rows, all scaled by the
+    scaler fitted on its training rows. Workers slice them without copying.
+    """
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=42)
+    Z = np.lib.format.open_memmap(
+        os.path.join(directory, "Z.npy"), mode="w+", dtype=np.float64, shape=(folds * len(X), X.shape[1])
+    )
+    y_folds = np.empty(folds * len(X), dtype=y.dtype)
+    bounds = np.empty((folds, 3), dtype=np.int64)
+    for fold, (train_index, validation_index) in enumerate(splitter.split(X, y)):
+        start = fold * len(X)
+        split = start + len(train_index)
+        order = np.concatenate([train_index, validation_index])
+        scaler = StandardScaler().fit(X[train_index])
+        Z[start:start + len(X)] = scaler.transform(X[order])
+        y_folds[start:start + len(X)] = y[order]
+        bounds[fold] = (start, split, start + len(X))
+    Z.flush()
+    del Z
+    np.save(os.path.join(directory, "y.npy"), y_folds)
+    np.save(os.path.join(directory, "bounds.npy"), bounds)
+
+
+def _map_folds(directory):
+    """Pool initializer: map the shared fold matrices once per worker"""
+    global _folds
+    warnings.simplefilter("ignore", ConvergenceWarning)
+    _folds = (
+        np.load(os.path.join(directory, "Z.npy"), mmap_mode="r"),
+        np.load(os.path.join(directory, "y.npy"), mmap_mode="r"),
+        np.load(os.path.join(directory, "bounds.npy")),
+    )
+
+
+def _score_fold(task):
+    """Fit one candidate on all folds but one and return its accuracy on that fold"""
+    index, params, fold = task
+    Z, y, bounds = _folds
+    start, split, end = bounds[fold]
+    model = make_model(params).fit(Z[start:split], y[start:split])
+    accuracy = float(np.mean(model.predict(Z[split:end]) == y[split:end]))
+    return index, fold, accuracy
+
+
+def search(executor, candidates, folds, prune_margin, workers):
+    """Evaluate candidates fold by fold, pruning clear losers; returns per-candidate fold scores"""
+    scores = {index: [] for index in range(len(candidates))}
+    alive = list(scores)
+    for fold in range(folds):
+        tasks = [(index, candidates[index], fold) for index in alive]
+        # A few tasks per worker per round amortize the inter-process overhead
+        chunksize = max(1, math.ceil(len(tasks) / (workers * 4)))
+        for index, _, accuracy in executor.map(_score_fold, tasks, chunksize=chunksize):
+            scores[index].append(accuracy)
+
+        if fold >= 1:
+            leader = max(np.mean(scores[index]) for index in alive)
+            alive = [index for index in alive if np.mean(scores[index]) >= leader - prune_margin]
+    return scores, alive
+
+
+def fit_cv_model(custom_data_path=None, grid=None, folds=None, workers=None, prune_margin=None):
+    """Search the grid with k-fold CV and fit the winner on the training split
+
+    Returns (model, scaler, holdout accuracy, kernel) like the full trainer,
+    and writes the per-candidate results to CV_RESULTS_PATH.
+    """
+    grid = grid or configured_grid()
+    folds = folds or CV_FOLDS
+    workers = workers or CV_WORKERS
+    prune_margin = CV_PRUNE_MARGIN if prune_margin is None else prune_margin
+    candidates = expand_grid(grid)
+    if not candidates:
+        raise ValueError("The hyperparameter grid has no valid solver/penalty combination")
+
+    started = time.perf_counter()
+    X, y = load_training_dataset(custom_data_path)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    directory = tempfile.mkdtemp(prefix="diabetes-cv-")
+    try:
+        write_folds(directory, X_train, y_train, folds)
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_map_folds, initargs=(directory,)
+        ) as executor:
+            scores, finalists = search(executor, candidates, folds, prune_margin, workers)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    best = max(finalists, key=lambda index: (np.mean(scores[index]), -index))
+    scaler = StandardScaler().fit(X_train)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", ConvergenceWarning)
+        model = make_model(candidates[best]).fit(scaler.transform(X_train), y_train)
+    accuracy = float(np.mean(model.predict(scaler.transform(X_test)) == y_test))
+
+    kernel = FusedKernel.from_model(model, scaler)
+    kernel.check_parity(model, scaler, X_test)
+
+    atomic_write_json({
+        "best_params": candidates[best],
+        "cv_accuracy": float(np.mean(scores[best])),
+        "holdout_accuracy": accuracy,
+        "folds": folds,
+        "workers": workers,
+        "seconds": time.perf_counter() - started,
+        "candidates": [
+            {
+                "params": params,
+                "fold_accuracies": scores[index],
+                "mean_accuracy": float(np.mean(scores[index])),
+                "pruned": len(scores[index]) < folds,
+            }
+            for index, params in enumerate(candidates)
+        ],
+    }, CV_RESULTS_PATH)
+    return model, scaler, accuracy, kernel
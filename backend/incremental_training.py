@@ -0,0 +1,212 @@
+"""Incremental training of the diabetes model from newly uploaded rows
+
+The full trainer refits StandardScaler and liblinear on every row each time.
+Here the model is instead updated from only the new rows:
+
+- the scaler is rebuilt from running sufficient statistics (count, mean, M2)
+  merged with the statistics of the new rows;
+- the classifier takes a few Newton steps on the new rows, anchored to the
+  previous weights by the accumulated Hessian of everything seen before (a
+  Laplace approximation of the earlier data), so old rows never need to be
+  revisited;
+- every FULL_REFIT_EVERY updates, or when holdout accuracy drops more than
+  MAX_ACCURACY_DROP below the last full refit, the model is refit from scratch
+  on the base training split plus the training store.
+
+Accuracy is always measured on the same holdout: the 20% test split of the
+base dataset.
+"""
+
+import os
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from dataset import append_row_file, load_base_dataset, load_custom_dataset, load_row_file
+from fused_kernel import FusedKernel, sigmoid
+from model_registry import atomic_save_npz
+
+STATE_PATH = "model/incremental_state.npz"
+TRAINING_STORE_PATH = "model/training_store.f32"
+
+FULL_REFIT_EVERY = int(os.getenv("INCREMENTAL_FULL_REFIT_EVERY", "10"))
+MAX_ACCURACY_DROP = float(os.getenv("INCREMENTAL_MAX_ACCURACY_DROP", "0.02"))
+NEWTON_ITERATIONS = 10
+
+# Inverse regularization strength, matching LogisticRegression's default
+C = 1.0
+
+
+def running_stats(X):
+    """Sufficient statistics (count, mean, M2) of the rows of X"""
+    X = np.asarray(X, dtype=np.float64)
+    if len(X) == 0:
+        return 0, np.zeros(X.shape[1]), np.zeros(X.shape[1])
+    mean = X.mean(axis=0)
+    return len(X), mean, ((X - mean) ** 2).sum(axis=0)
+
+
+def merge_stats(a, b):
+    """Combine two sets of running statistics (Chan et al. parallel update)"""
+    count_a, mean_a, m2_a = a
+    count_b, mean_b, m2_b = b
+    count = count_a + count_b
+    if count == 0:
+        return a
+    delta = mean_b - mean_a
+    mean = mean_a + delta * count_b / count
+    m2 = m2_a + m2_b + delta ** 2 * count_a * count_b / count
+    return count, mean, m2
+
+
+def scaler_from_stats(count, mean, m2):
+    """A fitted StandardScaler equivalent to fitting on the rows behind the statistics"""
+    var = m2 / count
+    scaler = StandardScaler()
+    scaler.mean_ = mean
+    scaler.var_ = var
+    # StandardScaler leaves constant features unscaled
+    scaler.scale_ = np.where(var > 0, np.sqrt(var), 1.0)
+    scaler.n_samples_seen_ = count
+    scaler.n_features_in_ = len(mean)
+    return scaler
+
+
+def _design(X, ref_mean, ref_scale):
+    """Standardize with the reference scaler and append the intercept column"""
+    Z = (np.asarray(X, dtype=np.float64) - ref_mean) / ref_scale
+    return np.hstack([Z, np.ones((len(Z), 1))])
+
+
+def _loss_hessian(weights, Z):
+    p = sigmoid(Z @ weights)
+    return C * (Z.T * (p * (1 - p))) @ Z
+
+
+def _newton_update(weights, prior_hessian, Z, y):
+    """Minimize 0.5 (w - w0)' H0 (w - w0) + C * logloss(Z w, y) starting from w0"""
+    anchor = weights
+    for _ in range(NEWTON_ITERATIONS):
+        p = sigmoid(Z @ weights)
+        gradient = prior_hessian @ (weights - anchor) + C * Z.T @ (p - y)
+        hessian = prior_hessian + _loss_hessian(weights, Z)
+        step = np.linalg.solve(hessian, gradient)
+        weights = weights - step
+        if np.max(np.abs(step)) < 1e-10:
+            break
+    return weights
+
+
+def _export(state):
+    """Express the reference-space weights as a LogisticRegression on the running scaler"""
+    scaler = scaler_from_stats(state["count"], state["mean"], state["m2"])
+
+    raw_weights = state["weights"][:-1] / state["ref_scale"]
+    raw_intercept = state["weights"][-1] - raw_weights @ state["ref_mean"]
+
+    model = LogisticRegression(solver='liblinear', random_state=42, C=C)
+    model.classes_ = np.array([0, 1])
+    model.coef_ = (raw_weights * scaler.scale_).reshape(1, -1)
+    model.intercept_ = np.array([raw_intercept + raw_weights @ scaler.mean_])
+    model.n_features_in_ = len(raw_weights)
+    model.n_iter_ = np.array([NEWTON_ITERATIONS], dtype=np.int32)
+    return model, scaler
+
+
+def _holdout_split():
+    base = load_base_dataset()
+    X, y = base[:, :-1].astype(np.float64), base[:, -1].astype(np.int64)
+    return train_test_split(X, y, test_size=0.2, random_state=42)
+
+
+def _full_refit(X_train, y_train, store_rows, X_test, y_test):
+    scaler = StandardScaler().fit(X_train)
+    model = LogisticRegression(solver='liblinear', random_state=42, C=C)
+    model.fit(scaler.transform(X_train), y_train)
+
+    weights = np.append(model.coef_[0], model.intercept_[0])
+    Z = _design(X_train, scaler.mean_, scaler.scale_)
+    # liblinear penalizes the intercept as well, so the prior covers every weight
+    hessian = np.eye(len(weights)) + _loss_hessian(weights, Z)
+
+    count, mean, m2 = running_stats(X_train)
+    kernel = FusedKernel.from_model(model, scaler)
+    return {
+        "count": count, "mean": mean, "m2": m2,
+        "ref_mean": scaler.mean_, "ref_scale": scaler.scale_,
+        "weights": weights, "hessian": hessian,
+        "store_rows": store_rows, "updates_since_refit": 0,
+        "refit_accuracy": _accuracy(kernel, X_test, y_test),
+    }
+
+
+def _accuracy(kernel, X, y):
+    return float(np.mean((kernel.predict_proba(X) > 0.5) == y))
+
+
+def load_state(path=None):
+    """Return the saved incremental state, or None before the first full refit"""
+    path = path or STATE_PATH
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as saved:
+        state = {key: saved[key] for key in saved.files}
+    for key in ("count", "store_rows", "updates_since_refit"):
+        state[key] = int(state[key])
+    state["refit_accuracy"] = float(state["refit_accuracy"])
+    return state
+
+
+def save_state(state, path=None):
+    """Atomically write the incremental state"""
+    atomic_save_npz(state, path or STATE_PATH)
+
+
+def fit_incremental_model(custom_data_path=None):
+    """Update the model from the rows of one upload; same return value as fit_diabetes_model"""
+    X_train, X_test, y_train, y_test = _holdout_split()
+    state = load_state()
+
+    new_rows = np.empty((0, X_train.shape[1] + 1), dtype=np.float32)
+    if custom_data_path and os.path.exists(custom_data_path):
+        new_rows = load_custom_dataset(custom_data_path)
+
+    committed = state["store_rows"] if state else 0
+    store_rows = append_row_file(TRAINING_STORE_PATH, new_rows, committed)
+
+    if state is None or state["updates_since_refit"] + 1 >= FULL_REFIT_EVERY:
+        state = _refit_with_store(X_train, y_train, store_rows, X_test, y_test)
+    else:
+        X_new = new_rows[:, :-1].astype(np.float64)
+        y_new = new_rows[:, -1].astype(np.float64)
+        if len(new_rows):
+            Z = _design(X_new, state["ref_mean"], state["ref_scale"])
+            weights = _newton_update(state["weights"], state["hessian"], Z, y_new)
+            state["hessian"] = state["hessian"] + _loss_hessian(weights, Z)
+            state["weights"] = weights
+            state["count"], state["mean"], state["m2"] = merge_stats(
+                (state["count"], state["mean"], state["m2"]), running_stats(X_new)
+            )
+        state["store_rows"] = store_rows
+        state["updates_since_refit"] += 1
+
+        # Drift correction: fall back to a full refit if the holdout regressed
+        model, scaler = _export(state)
+        accuracy = _accuracy(FusedKernel.from_model(model, scaler), X_test, y_test)
+        if accuracy < state["refit_accuracy"] - MAX_ACCURACY_DROP:
+            state = _refit_with_store(X_train, y_train, store_rows, X_test, y_test)
+
+    save_state(state)
+
+    model, scaler = _export(state)
+    kernel = FusedKernel.from_model(model, scaler)
+    return model, scaler, _accuracy(kernel, X_test, y_test), kernel
+
+
+def _refit_with_store(X_train, y_train, store_rows, X_test, y_test):
+    store = load_row_file(TRAINING_STORE_PATH, store_rows)
+    X_all = np.concatenate([X_train, store[:, :-1].astype(np.float64)])
+    y_all = np.concatenate([y_train, store[:, -1].astype(np.int64)])
+    return _full_refit(X_all, y_all, store_rows, X_test, y_test)
@@ -1,18 +1,33 @@
-"""Run diabetes prediction locally using the saved model file"""
+"""Run diabetes prediction locally using the saved model file
+
+With --output-path every row of a CSV is scored instead of the first one:
+the file is split into newline-aligned byte ranges that a process pool
+parses and scores, and the results are written in input row order.
+
+    python local_inference.py --data-path patients.csv --output-path scores.csv
+"""
 
 import argparse
-import joblib
+import io
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd
 
+from columnar_io import validate_features
+from model_artifact import map_artifact
+
 # Parse command line arguments
 parser = argparse.ArgumentParser()
 parser.add_argument(
     "--model-path",
     dest="model_path",
     type=str,
-    required=True,
-    help="Path to the saved model file (.joblib)"
+    default="model/diabetes_model.bin",
+    help="Path to the model bundle written by training"
 )
 parser.add_argument(
     "--data-path",
@@ -21,18 +36,47 @@ parser.add_argument(
     required=True,
     help="Path to the patient data (CSV file or single values)"
 )
+parser.add_argument(
+    "--output-path",
+    dest="output_path",
+    type=str,
+    default=None,
+    help="Score every row of the CSV and write logit, probability and prediction to this .csv or .npy file"
+)
+parser.add_argument(
+    "--workers",
+    dest="workers",
+    type=int,
+    default=os.cpu_count() or 1,
+    help="Processes scoring chunks in batch mode"
+)
+parser.add_argument(
+    "--chunk-bytes",
+    dest="chunk_bytes",
+    type=int,
+    default=4 * 1024 * 1024,
+    help="Approximate size of the CSV chunk each task parses and scores in batch mode"
+)
 args = parser.parse_args()
 
+OUTPUT_COLUMNS = ["logit", "probability", "prediction"]
+# Chunks queued or in flight per worker; bounds memory while keeping every worker busy
+CHUNKS_PER_WORKER = 2
+
+# Bundle and CSV layout of a batch worker, set by _init_batch_worker
+_worker = None
+
 def local_inference(model_path, data_path):
     """Run inference using the locally saved model"""
     print(f"Loading model from {model_path}...")
     
-    # Load the model package
-    model_package = joblib.load(model_path)
-    model = model_package['model']
-    scaler = model_package['scaler']
+    # Map the bundle: weights, scaler and the fused kernel, with the feature order they expect
+    bundle = map_artifact(model_path)
+    kernel = bundle.kernel
+    scaler = bundle.scaler
+    required_features = list(bundle.features)
     
-    print("Model loaded successfully.")
+    print(f"Model loaded successfully (version {bundle.version}, content hash {bundle.content_hash[:12]}).")
     
     # Load patient data
     if data_path.endswith('.csv'):
@@ -41,12 +85,6 @@ def local_inference(model_path, data_path):
         
         # Check if this is a row of features or missing any data
         if len(df.shape) == 1 or df.shape[0] == 1:
-            # Make sure we have all required features
-            required_features = [
-                'Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness',
-                'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age'
-            ]
-            
             # Drop outcome if present
             if 'Outcome' in df.columns:
                 df = df.drop('Outcome', axis=1)
@@ -56,11 +94,11 @@ def local_inference(model_path, data_path):
             if missing_features:
                 print(f"Warning: Missing features: {missing_features}")
             
-            # Use whatever features we have
-            features = df.values
+            # Use the bundle's feature order if every column is there, otherwise whatever we have
+            features = df[required_features].values if not missing_features else df.values
         else:
             # Multiple patients - use first row
-            print("Multiple patients found, using only the first row")
+            print("Multiple patients found, using only the first row (pass --output-path to score them all)")
             if 'Outcome' in df.columns:
                 features = df.drop('Outcome', axis=1).iloc[0].values.reshape(1, -1)
             else:
@@ -69,7 +107,7 @@ def local_inference(model_path, data_path):
         # Parse manual input (comma-separated values)
         try:
             values = list(map(float, data_path.split(',')))
-            expected_feature_count = 8  # For diabetes dataset
+            expected_feature_count = len(required_features)
             
             if len(values) != expected_feature_count:
                 print(f"Warning: Expected {expected_feature_count} features, but got {len(values)}")
@@ -80,25 +118,23 @@ def local_inference(model_path, data_path):
     
     print(f"Raw features: {features}")
     
-    # Apply standardization using the scaler
+    # Standardized features are only needed for display; the fused kernel scores raw features
     features_scaled = scaler.transform(features)
     print(f"Scaled features: {features_scaled}")
     
     # Make prediction
-    # Get both probability and raw prediction
-    prediction_proba = model.predict_proba(features_scaled)
-    prediction = model.predict(features_scaled)
-    
     # Extract logit value (log-odds)
     # For logistic regression: logit = log(p/(1-p))
-    # We can extract this from coef_ and intercept_
-    logit = model.decision_function(features_scaled)[0]
+    # The fused kernel computes it as a single dot product on the raw features
+    logit = kernel.decision_function(features)[0]
+    probability = kernel.predict_proba(features)[0]
+    prediction = int(probability > 0.5)
     
     print("\n----- RESULTS -----")
     print(f"Raw logit value: {logit:.6f}")
-    print(f"Probability of diabetes (class 1): {prediction_proba[0][1]:.6f}")
-    print(f"Prediction: {'Diabetic' if prediction[0] == 1 else 'Non-diabetic'}")
-    print(f"Raw prediction: {prediction[0]}")
+    print(f"Probability of diabetes (class 1): {probability:.6f}")
+    print(f"Prediction: {'Diabetic' if prediction == 1 else 'Non-diabetic'}")
+    print(f"Raw prediction: {prediction}")
     
     # Compare with manual calculation of probability from logit
     manual_prob = 1 / (1 + np.exp(-logit))
@@ -106,16 +142,126 @@ def local_inference(model_path, data_path):
     
     # Print model coefficients for reference
     print("\n----- MODEL INFO -----")
-    print(f"Coefficients: {model.coef_}")
-    print(f"Intercept: {model.intercept_}")
+    print(f"Fused coefficients: {kernel.weights}")
+    print(f"Fused intercept: {kernel.intercept}")
     
     return {
         'features': features,
         'scaled_features': features_scaled,
         'logit': logit,
-        'probability': prediction_proba[0][1],
-        'prediction': prediction[0]
+        'probability': probability,
+        'prediction': prediction
     }
 
+def chunk_ranges(data_path, start, chunk_bytes):
+    """Yield (start, end) byte ranges of about chunk_bytes, each ending after a newline"""
+    size = os.path.getsize(data_path)
+    with open(data_path, 'rb') as data_file:
+        while start < size:
+            data_file.seek(min(start + chunk_bytes, size))
+            data_file.readline()
+            end = min(data_file.tell(), size)
+            yield start, end
+            start = end
+
+
+def _init_batch_worker(model_path, data_path, columns, to_npy):
+    """Pool initializer: map the bundle once per worker"""
+    global _worker
+    _worker = (map_artifact(model_path), data_path, columns, to_npy)
+
+
+def _score_range(byte_range):
+    """Parse and score one byte range of the CSV; returns (rows, CSV text or float64 array)"""
+    bundle, data_path, columns, to_npy = _worker
+    start, end = byte_range
+    with open(data_path, 'rb') as data_file:
+        data_file.seek(start)
+        data = data_file.read(end - start)
+
+    options = {"header": None, "names": columns, "usecols": list(bundle.features)}
+    try:
+        df = pd.read_csv(io.BytesIO(data), dtype=np.float64, **options)
+    except ValueError:
+        # A non-numeric value somewhere; parse again and turn it into NaN
+        df = pd.read_csv(io.BytesIO(data), low_memory=False, **options).apply(pd.to_numeric, errors="coerce")
+    features = df[list(bundle.features)].to_numpy(dtype=np.float64)
+
+    # Scaling is folded into the kernel, so each chunk is one matrix-vector product
+    results = np.full((len(features), len(OUTPUT_COLUMNS)), np.nan)
+    valid = validate_features(features)
+    results[valid, 0] = bundle.kernel.decision_function(features[valid])
+    results[valid, 1] = 1 / (1 + np.exp(-results[valid, 0]))
+    results[valid, 2] = results[valid, 1] > 0.5
+    if to_npy:
+        return len(results), results
+
+    # Formatting the text here keeps it off the parent; invalid rows keep empty fields
+    lines = [
+        f"{logit!r},{probability!r},{prediction:.0f}" if prediction == prediction else ",,"
+        for logit, probability, prediction in results.tolist()
+    ]
+    return len(results), "".join(line + "\n" for line in lines)
+
+
+def write_npy_header(output_file, rows):
+    """(Re)write the header of a (rows, 3) float64 .npy file; its length does not depend on rows"""
+    output_file.seek(0)
+    np.lib.format.write_array_header_1_0(
+        output_file, {"descr": "<f8", "fortran_order": False, "shape": (rows, len(OUTPUT_COLUMNS))}
+    )
+    return output_file.tell()
+
+
+def batch_inference(model_path, data_path, output_path, workers, chunk_bytes):
+    """Score every row of a CSV of any size on a process pool and write the results in row order"""
+    bundle = map_artifact(model_path)
+    with open(data_path, 'rb') as data_file:
+        header = data_file.readline()
+    columns = pd.read_csv(io.BytesIO(header)).columns.tolist()
+    missing_features = [f for f in bundle.features if f not in columns]
+    if missing_features:
+        raise ValueError(f"{data_path} is missing the columns {missing_features}")
+    to_npy = output_path.endswith('.npy')
+
+    print(f"Scoring {data_path} with {workers} workers in chunks of {chunk_bytes} bytes...")
+    started = time.perf_counter()
+    rows = 0
+    with open(output_path, 'wb') as output_file, ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_batch_worker,
+        initargs=(model_path, data_path, columns, to_npy),
+    ) as executor:
+        if to_npy:
+            data_offset = write_npy_header(output_file, 0)
+        else:
+            output_file.write((",".join(OUTPUT_COLUMNS) + "\n").encode("utf-8"))
+
+        # Submit a window of chunks ahead and write results as the oldest completes
+        pending = deque()
+        ranges = chunk_ranges(data_path, len(header), chunk_bytes)
+        for byte_range in ranges:
+            pending.append(executor.submit(_score_range, byte_range))
+            if len(pending) >= workers * CHUNKS_PER_WORKER:
+                break
+        while pending:
+            chunk_rows, chunk = pending.popleft().result()
+            for byte_range in ranges:
+                pending.append(executor.submit(_score_range, byte_range))
+                break
+            output_file.write(chunk.tobytes() if to_npy else chunk.encode("utf-8"))
+            rows += chunk_rows
+
+        if to_npy and write_npy_header(output_file, rows) != data_offset:
+            raise RuntimeError(f"The .npy header of {output_path} changed size")
+    elapsed = time.perf_counter() - started
+
+    print(f"Scored {rows} rows in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/s); results saved to {output_path}")
+    return rows
+
+
 if __name__ == "__main__":
-    local_inference(args.model_path, args.data_path)
\ No newline at end of file
+    if args.output_path:
+        batch_inference(args.model_path, args.data_path, args.output_path, args.workers, args.chunk_bytes)
+    else:
+        local_inference(args.model_path, args.data_path)
\ No newline at end of file
@@ -0,0 +1,203 @@
+"""Read-only, memory-mapped model bundle shared by every entry point
+
+The trained model is stored in one file that every process maps instead of
+unpickling scikit-learn objects, so loading is a header parse and workers
+share the same page-cache pages. Format 2 is a 128-byte header, the feature
+order and little-endian float64 arrays:
+
+    header   magic, format version, DIM, model version, creation time (ns),
+             fixed-point log_scale and prime_size, SHA-256 of the content
+    features 256 bytes, comma-separated column names padded with NUL
+    coef     DIM       logistic regression weights on standardized features
+    intercept 1
+    mean     DIM       StandardScaler mean_
+    scale    DIM       StandardScaler scale_
+    kernel   DIM + 1   fused weights and intercept on raw features (FusedKernel)
+
+The content hash covers the features, the fixed-point setting and the arrays,
+so two bundles of the same model share it whatever their version. Format 1
+(64-byte header, no features, fixed point or hash) is still read, with
+FEATURE_COLUMNS and the calibrated fixed-point setting.
+
+A new bundle is written to a temporary file and renamed over the old one, so
+a mapping never sees a half-written file; readers re-map after the swap.
+"""
+
+import hashlib
+import mmap
+import struct
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from config import DIM, FEATURE_COLUMNS
+from fixed_point import FixedPoint, load_fixed_point
+from fused_kernel import FusedKernel
+
+MAGIC = b"ZTMODEL\0"
+FORMAT_VERSION = 2
+# Leading fields, the same in every format
+HEADER = struct.Struct("<8sIIQQ")
+# Format 2 fields following HEADER
+METADATA = struct.Struct("<II32s")
+HEADER_SIZES = {1: 64, 2: 128}
+FEATURES_SIZE = 256
+VALUE_COUNT = 4 * DIM + 2
+
+# One loaded model; content_hash is a hex SHA-256
+ModelBundle = namedtuple(
+    "ModelBundle",
+    ["version", "model", "scaler", "kernel", "fixed_point", "features", "content_hash"],
+    defaults=(None, tuple(FEATURE_COLUMNS), None),
+)
+
+
+class MappedScaler:
+    """StandardScaler stand-in over mapped mean_ and scale_ arrays"""
+
+    __slots__ = ("mean_", "scale_")
+
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, features):
+        return (np.asarray(features, dtype=np.float64) - self.mean_) / self.scale_
+
+    def inverse_transform(self, features):
+        return np.asarray(features, dtype=np.float64) * self.scale_ + self.mean_
+
+    def to_estimator(self):
+        """Rebuild a fitted sklearn StandardScaler"""
+        from sklearn.preprocessing import StandardScaler
+
+        scaler = StandardScaler()
+        scaler.mean_ = np.array(self.mean_)
+        scaler.scale_ = np.array(self.scale_)
+        scaler.var_ = scaler.scale_ ** 2
+        scaler.n_features_in_ = DIM
+        return scaler
+
+
+class MappedModel:
+    """Logistic regression weights over mapped coef_ and intercept_ arrays"""
+
+    __slots__ = ("coef_", "intercept_")
+
+    classes_ = np.array([0, 1])
+
+    def __init__(self, coef, intercept):
+        self.coef_ = coef.reshape(1, DIM)
+        self.intercept_ = intercept
+
+    def to_estimator(self):
+        """Rebuild a fitted sklearn LogisticRegression, e.g. to export it to Nillion"""
+        from sklearn.linear_model import LogisticRegression
+
+        model = LogisticRegression()
+        model.coef_ = np.array(self.coef_)
+        model.intercept_ = np.array(self.intercept_)
+        model.classes_ = np.array(self.classes_)
+        model.n_features_in_ = DIM
+        return model
+
+
+def _encode_features(features):
+    encoded = ",".join(features).encode("utf-8")
+    if len(encoded) > FEATURES_SIZE:
+        raise ValueError(f"Feature names take {len(encoded)} bytes, at most {FEATURES_SIZE} fit")
+    return encoded.ljust(FEATURES_SIZE, b"\0")
+
+
+def _content_hash(features_block, fixed_point, values_bytes):
+    digest = hashlib.sha256(features_block)
+    digest.update(struct.pack("<II", fixed_point.log_scale, fixed_point.prime_size))
+    digest.update(values_bytes)
+    return digest.digest()
+
+
+def write_artifact(file, version, model, scaler, kernel=None, fixed_point=None, features=None):
+    """Write a fitted model and scaler (and their fused kernel) to an open binary file
+
+    fixed_point defaults to the calibrated setting and features to FEATURE_COLUMNS.
+    """
+    if kernel is None:
+        kernel = FusedKernel.from_model(model, scaler)
+    fixed_point = fixed_point or load_fixed_point()
+    features_block = _encode_features(features or FEATURE_COLUMNS)
+    values = np.concatenate([
+        np.asarray(model.coef_, dtype=np.float64).reshape(DIM),
+        np.asarray(model.intercept_, dtype=np.float64).reshape(1),
+        np.asarray(scaler.mean_, dtype=np.float64).reshape(DIM),
+        np.asarray(scaler.scale_, dtype=np.float64).reshape(DIM),
+        kernel.packed,
+    ]).astype("<f8").tobytes()
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, DIM, version, time.time_ns()) + METADATA.pack(
+        fixed_point.log_scale, fixed_point.prime_size, _content_hash(features_block, fixed_point, values)
+    )
+    file.write(header.ljust(HEADER_SIZES[FORMAT_VERSION], b"\0"))
+    file.write(features_block)
+    file.write(values)
+
+
+def read_version(path):
+    """Model version in a bundle's header"""
+    with open(path, "rb") as file:
+        return _parse_header(file.read(HEADER.size), path)[1]
+
+
+def read_format(path):
+    """Format version of a bundle, e.g. to upgrade older files"""
+    with open(path, "rb") as file:
+        return _parse_header(file.read(HEADER.size), path)[0]
+
+
+def map_artifact(path):
+    """Map a bundle read-only and return a ModelBundle of views of it
+
+    Raises ValueError if the file is truncated or its content hash does not match.
+    """
+    with open(path, "rb") as file:
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    format_version, version = _parse_header(mapping[:HEADER.size], path)
+    header_size = HEADER_SIZES[format_version]
+    values_offset = header_size if format_version == 1 else header_size + FEATURES_SIZE
+    expected_size = values_offset + VALUE_COUNT * 8
+    if len(mapping) != expected_size:
+        raise ValueError(f"{path} is {len(mapping)} bytes, expected {expected_size}")
+
+    if format_version == 1:
+        fixed_point = load_fixed_point()
+        features = tuple(FEATURE_COLUMNS)
+        content_hash = hashlib.sha256(mapping[values_offset:]).hexdigest()
+    else:
+        log_scale, prime_size, stored_hash = METADATA.unpack_from(mapping, HEADER.size)
+        fixed_point = FixedPoint(log_scale, prime_size)
+        features_block = mapping[header_size:values_offset]
+        if _content_hash(features_block, fixed_point, mapping[values_offset:]) != stored_hash:
+            raise ValueError(f"{path} does not match its content hash")
+        features = tuple(features_block.rstrip(b"\0").decode("utf-8").split(","))
+        content_hash = stored_hash.hex()
+
+    # The arrays keep the mapping alive; it is released once the last snapshot using it is gone
+    values = np.frombuffer(mapping, dtype="<f8", count=VALUE_COUNT, offset=values_offset)
+    coef, intercept, mean, scale, packed = np.split(values, [DIM, DIM + 1, 2 * DIM + 1, 3 * DIM + 1])
+    return ModelBundle(
+        version, MappedModel(coef, intercept), MappedScaler(mean, scale), FusedKernel(packed),
+        fixed_point, features, content_hash,
+    )
+
+
+def _parse_header(header, path):
+    """(format version, model version) of a bundle header"""
+    if len(header) < HEADER.size:
+        raise ValueError(f"{path} is too short to be a model artifact")
+    magic, format_version, dim, version, _ = HEADER.unpack_from(header)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a model artifact")
+    if format_version not in HEADER_SIZES:
+        raise ValueError(f"{path} has artifact format {format_version}, expected at most {FORMAT_VERSION}")
+    if dim != DIM:
+        raise ValueError(f"{path} holds a {dim}-feature model, expected {DIM}")
+    return format_version, version
@@ -0,0 +1,199 @@
+"""In-memory registry for the served diabetes model bundle"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+import joblib
+import numpy as np
+
+from config import FEATURE_COLUMNS
+from fused_kernel import FusedKernel
+from model_artifact import FORMAT_VERSION, ModelBundle, map_artifact, read_format, read_version, write_artifact
+
+# Immutable view of one trained model; the classifier, scaler, the fused kernel
+# derived from them and the fixed-point setting always travel together. Served
+# snapshots are views of the memory-mapped model bundle (see model_artifact.py).
+ModelSnapshot = ModelBundle
+
+
+def _atomic_write(path, suffix, write):
+    """Call write(file) on a temporary file next to path and rename it into place"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            write(tmp_file)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_dump(obj, path):
+    """Write a joblib artifact to a temporary file and rename it into place"""
+    _atomic_write(path, ".joblib", lambda tmp_file: joblib.dump(obj, tmp_file))
+
+
+def atomic_save_npy(array, path):
+    """Write a NumPy array to a temporary .npy file and rename it into place"""
+    _atomic_write(path, ".npy", lambda tmp_file: np.save(tmp_file, array))
+
+
+def atomic_save_npz(arrays, path):
+    """Write a dict of NumPy arrays to a temporary .npz file and rename it into place"""
+    _atomic_write(path, ".npz", lambda tmp_file: np.savez(tmp_file, **arrays))
+
+
+def atomic_save_artifact(path, version, model, scaler, kernel=None, fixed_point=None):
+    """Write a memory-mappable model bundle to a temporary file and rename it into place"""
+    _atomic_write(
+        path, ".bin", lambda tmp_file: write_artifact(tmp_file, version, model, scaler, kernel, fixed_point)
+    )
+
+
+def atomic_write_json(obj, path):
+    """Write a JSON document to a temporary file and rename it into place"""
+    _atomic_write(path, ".json", lambda tmp_file: tmp_file.write(json.dumps(obj).encode("utf-8")))
+
+
+class ModelRegistry:
+    """Process-wide holder of the active model snapshot
+
+    The snapshot maps the model bundle read-only, so all worker processes
+    share one copy of the weights and never unpickle scikit-learn objects.
+    model_path and scaler_path name joblib files written by older releases;
+    they are only read to convert them to a bundle once.
+    Afterwards readers only dereference the current snapshot; publishing a new
+    model swaps the artifact file and the whole snapshot at once so a reader
+    never pairs a new model with an old scaler. At most every refresh_interval
+    seconds `current()` checks whether another process swapped the artifact
+    and re-maps it.
+    """
+
+    def __init__(self, artifact_path, model_path=None, scaler_path=None, refresh_interval=None):
+        self.artifact_path = artifact_path
+        self.model_path = model_path
+        self.scaler_path = scaler_path
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._loaded_stamp = None
+        self._next_check = 0.0
+
+    @property
+    def loaded(self):
+        """True once a snapshot is active, without touching the disk"""
+        return self._snapshot is not None
+
+    def current(self):
+        """Return the active snapshot, loading it from disk on first use"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.load()
+        if self.refresh_interval is not None:
+            now = time.monotonic()
+            if now >= self._next_check:
+                self._next_check = now + self.refresh_interval
+                if self._stamp() != self._loaded_stamp:
+                    return self.refresh()
+        return snapshot
+
+    def load(self):
+        """Map the bundle if no snapshot is active yet
+
+        Models saved as joblib files or as an older bundle format are
+        converted once; later loads just map the file.
+        """
+        with self._lock:
+            if self._snapshot is None:
+                if self._artifact_outdated():
+                    model = joblib.load(self.model_path)
+                    scaler = joblib.load(self.scaler_path)
+                    atomic_save_artifact(self.artifact_path, self._disk_version() + 1, model, scaler)
+                elif not os.path.exists(self.artifact_path):
+                    return None
+                elif read_format(self.artifact_path) < FORMAT_VERSION:
+                    self._rewrite(self.artifact_path, None)
+                self._map()
+            return self._snapshot
+
+    def refresh(self):
+        """Re-map the artifact if another process replaced it after it was mapped
+
+        Workers forked from a preloaded master start with the master's snapshot,
+        and any worker may publish a model the others have not mapped yet.
+        """
+        with self._lock:
+            if self._snapshot is not None and self._stamp() != self._loaded_stamp:
+                self._snapshot = None
+        return self.load()
+
+    def publish(self, model, scaler, kernel=None, fixed_point=None):
+        """Persist a newly trained model and make it the active snapshot
+
+        The bundle records fixed_point, by default the calibrated setting.
+        """
+        with self._lock:
+            if kernel is None:
+                kernel = FusedKernel.from_model(model, scaler)
+            # Renamed into place in one step: other workers pick the model up from this file
+            atomic_save_artifact(self.artifact_path, self._disk_version() + 1, model, scaler, kernel, fixed_point)
+            return self._map()
+
+    def restore(self, artifact_file, fixed_point=None):
+        """Publish the model in a bundle saved earlier under a new version, without unpickling it
+
+        The fixed-point setting is replaced by fixed_point, by default the
+        calibrated one, so restoring the active bundle restamps its precision.
+        """
+        with self._lock:
+            self._rewrite(artifact_file, fixed_point)
+            return self._map()
+
+    def _rewrite(self, artifact_file, fixed_point):
+        bundle = map_artifact(artifact_file)
+        atomic_save_artifact(
+            self.artifact_path, self._disk_version() + 1, bundle.model, bundle.scaler, bundle.kernel, fixed_point
+        )
+
+    def _map(self):
+        stamp = self._stamp()
+        snapshot = map_artifact(self.artifact_path)
+        if snapshot.features != tuple(FEATURE_COLUMNS):
+            raise ValueError(f"{self.artifact_path} was trained on features {snapshot.features}, "
+                             f"expected {tuple(FEATURE_COLUMNS)}")
+        self._snapshot = snapshot
+        self._loaded_stamp = stamp
+        return self._snapshot
+
+    def _disk_version(self):
+        """Version of the artifact on disk (0 if there is none), so versions increase across processes"""
+        if not os.path.exists(self.artifact_path):
+            return self._snapshot.version if self._snapshot else 0
+        return max(read_version(self.artifact_path), self._snapshot.version if self._snapshot else 0)
+
+    def _artifact_outdated(self):
+        """True if legacy joblib files hold a model the bundle does not have yet"""
+        if not (self.model_path and self.scaler_path):
+            return False
+        if not (os.path.exists(self.model_path) and os.path.exists(self.scaler_path)):
+            return False
+        if not os.path.exists(self.artifact_path):
+            return True
+        artifact_mtime = os.stat(self.artifact_path).st_mtime_ns
+        return any(os.stat(path).st_mtime_ns > artifact_mtime for path in (self.model_path, self.scaler_path))
+
+    def _stamp(self):
+        """Inode, modification time and size of the artifact; an atomic swap changes the inode"""
+        try:
+            stat = os.stat(self.artifact_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
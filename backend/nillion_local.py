@@ -0,0 +1,236 @@
+"""In-process stand-in for the Nillion network, for load testing the secure path offline
+
+`LocalNetwork` and `LocalVmClient` mirror the parts of `nillion_client.Network`
+and `VmClient` the backend uses: `store_program`, `store_values`, `compute`
+and `retrieve_compute_results` return operations that are awaited through
+`.invoke()`. Computations evaluate the logistic regression forward pass of
+diabetes_prediction(_batch) in the same fixed point as nada_numpy's
+SecretRational (the calibrated log scale the programs are built with), with
+each product truncated like nada_numpy's (fixed_point.truncate_products), so
+results decode like the network's and match calibrate_fixed_point.py.
+
+Every operation waits for a configurable latency plus uniform jitter and
+fails with `LocalNetworkError` at a configurable rate.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+import uuid
+from collections import namedtuple
+
+import numpy as np
+
+from fixed_point import load_fixed_point, truncate_products
+
+# Mirrors the objects returned by retrieve_compute_results; only .value is read
+LocalValue = namedtuple("LocalValue", ["value"])
+
+
+class LocalNetworkError(Exception):
+    """Injected failure of a stand-in network operation"""
+
+
+def _parse_latency(spec):
+    """Parse "0.05" or "default=0.05,compute=0.8" into per-operation seconds"""
+    latency = {}
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        operation, _, seconds = part.rpartition("=")
+        latency[operation or "default"] = float(seconds)
+    return latency
+
+
+class LocalNetwork:
+    """Shared state of the stand-in network: programs, stored values and pending results
+
+    `latency` is either a number of seconds applied to every operation or a
+    dict of seconds per operation name (store_program, store_values, compute,
+    retrieve_compute_results) with an optional "default". `jitter` adds up to
+    that many seconds on top, and each operation fails with probability
+    `failure_rate`. When `state_path` is set, programs and values are kept in
+    that JSON file so separate processes (train_model.py, run_inference.py)
+    see the same network. Programs compute with `log_scale` fractional bits,
+    by default those of model/fixed_point.json.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, seed=None, state_path=None, log_scale=None):
+        self.log_scale = log_scale if log_scale is not None else load_fixed_point().log_scale
+        self.latency = latency if isinstance(latency, dict) else {"default": float(latency)}
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.state_path = state_path
+        self._random = random.Random(seed)
+        self._truncation_rng = np.random.default_rng(seed)
+        self.programs = {}
+        self.values = {}
+        self.results = {}
+        self._load_state()
+
+    @classmethod
+    def from_env(cls):
+        """Configure the stand-in from NILLION_LOCAL_* environment variables"""
+        seed = os.getenv("NILLION_LOCAL_SEED")
+        return cls(
+            latency=_parse_latency(os.getenv("NILLION_LOCAL_LATENCY", "0")),
+            jitter=float(os.getenv("NILLION_LOCAL_JITTER", "0")),
+            failure_rate=float(os.getenv("NILLION_LOCAL_FAILURE_RATE", "0")),
+            seed=int(seed) if seed is not None else None,
+            state_path=os.getenv("NILLION_LOCAL_STATE") or None,
+        )
+
+    async def simulate(self, operation):
+        """Wait out the configured latency of an operation and maybe fail it"""
+        delay = self.latency.get(operation, self.latency.get("default", 0.0))
+        if self.jitter:
+            delay += self._random.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            raise LocalNetworkError(f"injected failure in {operation}")
+
+    def _load_state(self):
+        if self.state_path and os.path.exists(self.state_path):
+            with open(self.state_path, "r") as state_file:
+                state = json.load(state_file)
+            self.programs = state["programs"]
+            self.values = {uuid.UUID(hex=store_id): stored for store_id, stored in state["values"].items()}
+
+    def save_state(self):
+        """Write programs and values to state_path, if one is configured"""
+        if not self.state_path:
+            return
+        state = {
+            "programs": self.programs,
+            "values": {store_id.hex: stored for store_id, stored in self.values.items()},
+        }
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as state_file:
+            json.dump(state, state_file)
+        os.replace(tmp_path, self.state_path)
+
+
+class _Operation:
+    """Pending stand-in operation, run when invoked like the real client's"""
+
+    def __init__(self, network, name, run):
+        self.network = network
+        self.name = name
+        self.run = run
+
+    async def invoke(self):
+        await self.network.simulate(self.name)
+        return self.run()
+
+
+def _fixed_point(secret, log_scale):
+    """Integer fixed-point value of a stored secret (or of a plain number)"""
+    value = getattr(secret, "value", secret)
+    if isinstance(value, int):
+        return value
+    return int(round(float(value) * 2 ** log_scale))
+
+
+def _collect(values, prefix):
+    """Gather the secrets named prefix_i[_j] into a nested list indexed like the array"""
+    pattern = re.compile(re.escape(prefix) + r"((?:_\d+)+)$")
+    entries = {}
+    for name, value in values.items():
+        match = pattern.match(name)
+        if match:
+            entries[tuple(int(i) for i in match.group(1)[1:].split("_"))] = value
+    if not entries:
+        raise KeyError(f"No values named {prefix}_* were provided")
+    if all(len(index) == 1 for index in entries):
+        return [entries[(i,)] for i in range(len(entries))]
+    rows = max(index[0] for index in entries) + 1
+    return [[entries[index] for index in sorted(entries) if index[0] == row] for row in range(rows)]
+
+
+def _forward(values, log_scale, rng):
+    """diabetes_logit_i = patient_data[i] . coef + intercept, in fixed point"""
+    coef = _collect(values, "diabetes_model_coef")[0]
+    intercept = _collect(values, "diabetes_model_intercept")[0]
+    patients = _collect(values, "patient_data")
+    if not isinstance(patients[0], list):
+        patients = [patients]
+
+    outputs = {}
+    for row, patient in enumerate(patients):
+        # Each product carries twice the precision and is truncated back before the sum, as in nada_numpy
+        products = [_fixed_point(w, log_scale) * _fixed_point(x, log_scale) for w, x in zip(coef, patient)]
+        dot = int(truncate_products(products, log_scale, rng).sum())
+        outputs[f"diabetes_logit_{row}"] = LocalValue(dot + intercept)
+    return outputs
+
+
+class LocalVmClient:
+    """Stand-in for nillion_client.VmClient backed by a LocalNetwork"""
+
+    def __init__(self, network, user_id):
+        self.network = network
+        self.user_id = user_id
+
+    @classmethod
+    async def create(cls, signing_key, network, payer=None):
+        """Connect a client; its user id is derived from the signing key like on the network"""
+        await network.simulate("create")
+        key = getattr(signing_key, "private_key", signing_key)
+        key_bytes = key if isinstance(key, bytes) else repr(key).encode("utf-8")
+        return cls(network, hashlib.sha256(key_bytes).hexdigest()[:40])
+
+    async def balance(self):
+        await self.network.simulate("balance")
+        return 0
+
+    async def add_funds(self, amount):
+        await self.network.simulate("add_funds")
+
+    def store_program(self, name, program_mir):
+        def run():
+            program_id = f"{self.user_id}/{name}"
+            self.network.programs[program_id] = hashlib.sha256(program_mir).hexdigest()
+            self.network.save_state()
+            return program_id
+        return _Operation(self.network, "store_program", run)
+
+    def store_values(self, values, ttl_days, permissions=None, update_identifier=None):
+        def run():
+            if update_identifier is not None and update_identifier not in self.network.values:
+                raise LocalNetworkError(f"values {update_identifier} not found")
+            store_id = update_identifier or uuid.uuid4()
+            self.network.values[store_id] = {
+                "values": {name: _fixed_point(secret, self.network.log_scale) for name, secret in values.items()},
+                "expires_at": time.time() + ttl_days * 86400,
+            }
+            self.network.save_state()
+            return store_id
+        return _Operation(self.network, "store_values", run)
+
+    def compute(self, program_id, input_bindings, output_bindings, values, value_ids):
+        def run():
+            if program_id not in self.network.programs:
+                raise LocalNetworkError(f"program {program_id} not found")
+            inputs = {name: _fixed_point(secret, self.network.log_scale) for name, secret in values.items()}
+            for store_id in value_ids:
+                stored = self.network.values.get(store_id)
+                if stored is None or stored["expires_at"] < time.time():
+                    raise LocalNetworkError(f"values {store_id} not found or expired")
+                inputs.update(stored["values"])
+            compute_id = uuid.uuid4()
+            self.network.results[compute_id] = _forward(inputs, self.network.log_scale, self.network._truncation_rng)
+            return compute_id
+        return _Operation(self.network, "compute", run)
+
+    def retrieve_compute_results(self, compute_id):
+        def run():
+            if compute_id not in self.network.results:
+                raise LocalNetworkError(f"compute {compute_id} not found")
+            return self.network.results.pop(compute_id)
+        return _Operation(self.network, "retrieve_compute_results", run)
@@ -0,0 +1,144 @@
+"""Long-lived Nillion client sessions shared across secure requests"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import namedtuple
+from contextlib import asynccontextmanager
+
+from fixed_point import fixed_point_from_provider
+
+# Parsed contents of provider_info.json
+ProviderInfo = namedtuple(
+    "ProviderInfo", ["program_id", "model_store_id", "model_provider_user_id", "batch_program_id", "fixed_point"]
+)
+
+
+class ProviderInfoCache:
+    """In-memory copy of the provider identifiers written after a model upload"""
+
+    def __init__(self, path, parse_user_id):
+        self.path = path
+        self.parse_user_id = parse_user_id
+        self._info = None
+
+    def get(self):
+        """Return the cached identifiers, reading the file on first use"""
+        info = self._info
+        if info is None:
+            if not os.path.exists(self.path):
+                raise FileNotFoundError("Model not deployed to Nillion yet. Please train the model first.")
+            with open(self.path, "r") as provider_variables_file:
+                info = self.set(json.load(provider_variables_file))
+        return info
+
+    def set(self, provider_variables):
+        """Replace the cached identifiers with freshly stored ones"""
+        self._info = ProviderInfo(
+            program_id=provider_variables["program_id"],
+            model_store_id=uuid.UUID(hex=provider_variables["model_store_id"]),
+            model_provider_user_id=self.parse_user_id(provider_variables["model_provider_user_id"]),
+            batch_program_id=provider_variables.get("batch_program_id"),
+            fixed_point=fixed_point_from_provider(provider_variables),
+        )
+        return self._info
+
+
+class _Session:
+    __slots__ = ("client", "checked_at", "suspect")
+
+    def __init__(self, client):
+        self.client = client
+        self.checked_at = time.monotonic()
+        self.suspect = False
+
+
+class NillionClientPool:
+    """Warmed VmClient sessions per party, handed out to one request at a time
+
+    `client_factory(party)` creates a connected client for a party and
+    `health_check(client)` raises or returns False when a session is no longer
+    usable. Sessions are health-checked after they have been idle for
+    `health_check_interval` seconds or after a request using them failed, and
+    are recreated when the check does not pass.
+    """
+
+    def __init__(self, client_factory, parties, size=1, health_check=None, health_check_interval=60.0):
+        self.client_factory = client_factory
+        self.parties = list(parties)
+        self.size = size
+        self.health_check = health_check
+        self.health_check_interval = health_check_interval
+        self._queues = {}
+
+    def _queue(self, party):
+        queue = self._queues.get(party)
+        if queue is None:
+            if party not in self.parties:
+                raise KeyError(f"Unknown Nillion party: {party}")
+            # Empty slots are filled lazily with new sessions on acquire
+            queue = asyncio.Queue()
+            for _ in range(self.size):
+                queue.put_nowait(None)
+            self._queues[party] = queue
+        return queue
+
+    async def start(self):
+        """Create every session up front so the first request does not pay for it"""
+        for party in self.parties:
+            queue = self._queue(party)
+            slots = [queue.get_nowait() for _ in range(queue.qsize())]
+            try:
+                for index, session in enumerate(slots):
+                    if session is None:
+                        slots[index] = _Session(await self.client_factory(party))
+            finally:
+                for session in slots:
+                    queue.put_nowait(session)
+
+    async def close(self):
+        """Drop all sessions; they are recreated on next use"""
+        for party, queue in self._queues.items():
+            for _ in range(queue.qsize()):
+                session = queue.get_nowait()
+                close = getattr(session.client, "close", None) if session else None
+                if close is not None:
+                    result = close()
+                    if asyncio.iscoroutine(result):
+                        await result
+                queue.put_nowait(None)
+
+    @asynccontextmanager
+    async def session(self, party):
+        """Borrow a healthy client for `party` for the duration of the block"""
+        queue = self._queue(party)
+        session = await queue.get()
+        try:
+            session = await self._ensure_healthy(party, session)
+            yield session.client
+            session.checked_at = time.monotonic()
+        except BaseException:
+            if session is not None:
+                session.suspect = True
+            raise
+        finally:
+            queue.put_nowait(session)
+
+    async def _ensure_healthy(self, party, session):
+        if session is not None and self.health_check is not None:
+            idle = time.monotonic() - session.checked_at
+            if session.suspect or idle > self.health_check_interval:
+                try:
+                    healthy = await self.health_check(session.client) is not False
+                except Exception:
+                    healthy = False
+                if healthy:
+                    session.suspect = False
+                    session.checked_at = time.monotonic()
+                else:
+                    session = None
+        if session is None:
+            session = _Session(await self.client_factory(party))
+        return session
@@ -0,0 +1,113 @@
+"""Content-addressed Nillion uploads and background TTL renewal"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+
+def hash_programs(programs):
+    """Content hash of a set of compiled Nada programs keyed by program name"""
+    digest = hashlib.sha256()
+    for name in sorted(programs):
+        digest.update(f"{name}:{len(programs[name])};".encode("utf-8"))
+        digest.update(programs[name])
+    return digest.hexdigest()
+
+
+def hash_model_secrets(program_hash, model_secrets):
+    """Content hash of exported model secrets, bound to the program they are stored for"""
+    digest = hashlib.sha256(program_hash.encode("utf-8"))
+    for name in sorted(model_secrets):
+        secret = model_secrets[name]
+        value = getattr(secret, "value", secret)
+        digest.update(f"{name}:{type(secret).__name__}:{value!r};".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def read_provider_variables(path):
+    """Return the stored provider variables, or None if nothing was uploaded yet"""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as provider_variables_file:
+        return json.load(provider_variables_file)
+
+
+def is_expiring(provider_variables, margin_seconds, now=None):
+    """True when the stored model's TTL ends within margin_seconds (or is unknown)"""
+    expires_at = provider_variables.get("expires_at")
+    if expires_at is None:
+        return True
+    return expires_at - margin_seconds <= (now if now is not None else time.time())
+
+
+class TtlRenewalScheduler:
+    """Background task that renews stored Nillion values before their TTL runs out
+
+    `read_expiry()` returns the unix time at which the stored model expires (or
+    None when nothing is stored) and `renew()` re-stores it with a fresh TTL.
+    Call `wake()` after a new upload so the schedule is recomputed.
+    """
+
+    def __init__(self, read_expiry, renew, margin_seconds, retry_seconds=300.0):
+        self.read_expiry = read_expiry
+        self.renew = renew
+        self.margin_seconds = margin_seconds
+        self.retry_seconds = retry_seconds
+        self._wake = None
+        self._task = None
+
+    def start(self):
+        """Start the renewal loop on the running event loop"""
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Cancel the renewal loop"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self):
+        """Recompute the schedule, e.g. after the model was uploaded again"""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _run(self):
+        delay = 0.0
+        while True:
+            if await self._sleep(delay):
+                delay = 0.0
+                continue
+
+            try:
+                expires_at = self.read_expiry()
+                if expires_at is None:
+                    delay = None
+                    continue
+                renew_at = expires_at - self.margin_seconds
+                if renew_at > time.time():
+                    delay = renew_at - time.time()
+                    continue
+                await self.renew()
+                if self.read_expiry() == expires_at:
+                    raise RuntimeError("renewal did not extend the stored TTL")
+                delay = 0.0
+            except Exception as e:
+                print(f"Nillion TTL renewal failed, retrying in {self.retry_seconds:.0f}s: {e}")
+                delay = self.retry_seconds
+
+    async def _sleep(self, delay):
+        """Wait for delay seconds (forever if None); True if woken early"""
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            return False
+        self._wake.clear()
+        return True
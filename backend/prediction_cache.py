@@ -0,0 +1,67 @@
+"""In-memory LRU cache of prediction results for repeated patient vectors"""
+
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class PredictionCache:
+    """Size- and TTL-bounded LRU map from (model version, feature vector) to a probability
+
+    Keys are an HMAC-SHA256 of the exact float64 feature vector and the model
+    version under a random per-process secret, so raw patient values are never
+    kept, and nothing is ever written to disk. Entries for an older model
+    version can no longer be hit; `clear()` drops them right away.
+    """
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._secret = os.urandom(32)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def key(self, model_version, features):
+        """Keyed hash of a feature vector for one model version"""
+        digest = hmac.new(self._secret, str(model_version).encode("utf-8") + b"\0", hashlib.sha256)
+        digest.update(np.ascontiguousarray(features, dtype=np.float64).tobytes())
+        return digest.digest()
+
+    def get(self, key):
+        """Return the cached probability for a key, or None on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            return None
+
+    def put(self, key, probability):
+        """Cache a probability, evicting the least recently used entries beyond max_entries"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (probability, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry, e.g. after a new model was published"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -4,7 +4,9 @@ import argparse
 import numpy as np
 import pandas as pd
 import json
-from sklearn.preprocessing import StandardScaler
+
+from fixed_point import fixed_point_from_provider
+from model_artifact import map_artifact
 
 # Parse command line arguments
 PARSER = argparse.ArgumentParser()
@@ -15,12 +17,19 @@ PARSER.add_argument(
     required=True,
     help="Path to the raw diabetes patient data"
 )
+PARSER.add_argument(
+    "--model-path",
+    dest="model_path",
+    type=str,
+    default="model/diabetes_model.bin",
+    help="Path to the model bundle holding the scaler parameters and weights"
+)
 PARSER.add_argument(
     "--provider-info-path",
     dest="provider_info_path",
     type=str,
-    required=True,
-    help="Path to the provider variables JSON file"
+    default=None,
+    help="Provider variables JSON of the stored model; its fixed-point setting overrides the bundle's"
 )
 PARSER.add_argument(
     "--output-path",
@@ -31,16 +40,19 @@ PARSER.add_argument(
 )
 ARGS = PARSER.parse_args()
 
-def preprocess_data(data_path, provider_info_path, output_path):
+def preprocess_data(data_path, model_path, provider_info_path, output_path):
     """Preprocess patient data for Nada AI inference"""
     print("Loading patient data...")
     
-    # Load provider info to get scaler parameters
-    with open(provider_info_path, 'r') as f:
-        provider_info = json.load(f)
-    
-    scaler_mean = np.array(provider_info["scaler_params"]["mean"])
-    scaler_scale = np.array(provider_info["scaler_params"]["scale"])
+    # Scaler parameters, weights, feature order and precision all come from the model bundle
+    bundle = map_artifact(model_path)
+    scaler_mean = bundle.scaler.mean_
+    scaler_scale = bundle.scaler.scale_
+    fixed_point = bundle.fixed_point
+    if provider_info_path:
+        # The stored model was encoded with the precision recorded at upload time
+        with open(provider_info_path, 'r') as f:
+            fixed_point = fixed_point_from_provider(json.load(f))
     
     # Print scaler parameters for verification
     print("Using scaler mean values:")
@@ -54,10 +66,7 @@ def preprocess_data(data_path, provider_info_path, output_path):
         # Check if this is a single patient or multiple patients
         if len(df.shape) == 1 or df.shape[0] == 1:
             # Single patient - ensure we have all required features
-            required_features = [
-                'Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness',
-                'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age'
-            ]
+            required_features = list(bundle.features)
             
             # Check for column names that might be abbreviated
             rename_mapping = {
@@ -104,19 +113,16 @@ def preprocess_data(data_path, provider_info_path, output_path):
     print(f"Feature shape after scaling: {features_scaled.shape}")
     print(f"First few values: {features_scaled.flatten()[:3]}")
     
-    # Manual logit calculation (if model coefficients are available)
-    if "model_coefficients" in provider_info and "model_intercept" in provider_info:
-        coefficients = np.array(provider_info["model_coefficients"])
-        intercept = provider_info["model_intercept"]
-        logit = np.dot(features_scaled, coefficients.T) + intercept
-        probability = 1 / (1 + np.exp(-logit))
-        
-        print(f"Locally computed logit: {logit[0][0]}")
-        print(f"Locally computed probability: {probability[0][0]}")
-        
-        scale_factor = provider_info.get("scale_factor", 2**20)
-        scaled_logit = int(logit[0][0] * scale_factor)
-        print(f"Locally computed scaled logit (fixed-point): {scaled_logit}")
+    # Manual logit calculation with the bundle's coefficients
+    logit = np.dot(features_scaled, bundle.model.coef_.T) + bundle.model.intercept_
+    probability = 1 / (1 + np.exp(-logit))
+    
+    print(f"Locally computed logit: {logit[0][0]}")
+    print(f"Locally computed probability: {probability[0][0]}")
+    
+    scale_factor = 2 ** fixed_point.log_scale
+    scaled_logit = int(logit[0][0] * scale_factor)
+    print(f"Locally computed scaled logit (fixed-point): {scaled_logit}")
     
     # Save processed features
     np.save(output_path, features_scaled)
@@ -125,4 +131,4 @@ def preprocess_data(data_path, provider_info_path, output_path):
     return features_scaled
 
 if __name__ == "__main__":
-    preprocess_data(ARGS.data_path, ARGS.provider_info_path, ARGS.output_path)
\ No newline at end of file
+    preprocess_data(ARGS.data_path, ARGS.model_path, ARGS.provider_info_path, ARGS.output_path)
\ No newline at end of file
@@ -2,9 +2,10 @@ import argparse
 import asyncio
 import json
 import os
+import random
+import time
 import uuid
 
-import joblib
 import numpy as np
 import pandas as pd
 
@@ -13,9 +14,13 @@ import nada_numpy.client as na_client
 from dotenv import load_dotenv
 from nillion_client import (InputPartyBinding, Network, NilChainPayer,
                            NilChainPrivateKey, OutputPartyBinding,
-                           Permissions, PrivateKey, SecretInteger, VmClient)
+                           Permissions, PrivateKey, VmClient)
 from nillion_client.ids import UserId
 
+from columnar_io import validate_features
+from fixed_point import decode_probability, fixed_point_from_provider
+from model_artifact import map_artifact
+
 home = os.getenv("HOME")
 load_dotenv("nillion.env")
 
@@ -33,8 +38,49 @@ PARSER.add_argument(
     type=str,
     required=True,
 )
+PARSER.add_argument(
+    "--network",
+    dest="network",
+    choices=["testnet", "local"],
+    default=os.getenv("NILLION_NETWORK", "testnet"),
+    help="Nillion testnet, or the in-process stand-in (set NILLION_LOCAL_STATE to share it between scripts)",
+)
+PARSER.add_argument(
+    "--output-path",
+    dest="output_path",
+    type=str,
+    default=None,
+    help="Score every patient of the --patient-data CSV and append the results to this CSV; "
+         "rerunning with the same path resumes after the rows already written",
+)
+PARSER.add_argument(
+    "--concurrency",
+    dest="concurrency",
+    type=int,
+    default=16,
+    help="Patients stored, computed and retrieved at the same time in cohort mode",
+)
+PARSER.add_argument(
+    "--max-attempts",
+    dest="max_attempts",
+    type=int,
+    default=4,
+    help="Tries per patient in cohort mode before it is reported as failed",
+)
+PARSER.add_argument(
+    "--retry-backoff",
+    dest="retry_backoff",
+    type=float,
+    default=1.0,
+    help="Seconds before the first retry in cohort mode; doubled (with jitter) for every further retry",
+)
 ARGS = PARSER.parse_args()
 
+COHORT_COLUMNS = ["row", "logit", "probability", "prediction"]
+
+if ARGS.network == "local":
+    from nillion_local import LocalNetwork as Network, LocalVmClient as VmClient
+
 async def fund_chain(client, funds_amount=3000000):
     """Add funds to a Nillion client"""
     print(f"💰  Adding {funds_amount} uNIL to client balance...")
@@ -44,12 +90,15 @@ async def fund_chain(client, funds_amount=3000000):
 
 async def new_client(network, id: int, private_key: bytes = None):
     """Create a new VmClient for a participant"""
-    nilchain_key: str = os.getenv(f"NILLION_NILCHAIN_PRIVATE_KEY_{id}")  # Load private key for payment
-    payer = NilChainPayer(
-        network,
-        wallet_private_key=NilChainPrivateKey(bytes.fromhex(nilchain_key)),
-        gas_limit=10000000,
-    )
+    # The local stand-in does not charge for operations
+    payer = None
+    if ARGS.network != "local":
+        nilchain_key: str = os.getenv(f"NILLION_NILCHAIN_PRIVATE_KEY_{id}")  # Load private key for payment
+        payer = NilChainPayer(
+            network,
+            wallet_private_key=NilChainPrivateKey(bytes.fromhex(nilchain_key)),
+            gas_limit=10000000,
+        )
 
     # Use random key or passed private key
     signing_key = PrivateKey(private_key)
@@ -58,11 +107,14 @@ async def new_client(network, id: int, private_key: bytes = None):
     return client
 
 
-def load_patient_data(patient_data_input):
+def load_patient_data(patient_data_input, features):
     """Load patient data from file or parse from command line"""
     if os.path.exists(patient_data_input):
         if patient_data_input.endswith('.csv'):
             df = pd.read_csv(patient_data_input)
+            # Pick the columns in the order the model was trained on when they are named
+            if all(feature in df.columns for feature in features):
+                df = df[list(features)]
             if len(df) > 0:
                 return df.iloc[0].values  # Return first row
         else:
@@ -73,21 +125,138 @@ def load_patient_data(patient_data_input):
         except ValueError:
             raise ValueError("Patient data must be a valid CSV file or comma-separated values")
 
-async def main(patient_data_input: str, in_path: str) -> None:
-    network = Network.from_config("devnet")
+def load_cohort(patient_data_input, features):
+    """Every patient of a CSV as a float matrix in the model's feature order; unparsable values become NaN"""
+    df = pd.read_csv(patient_data_input)
+    missing_features = [f for f in features if f not in df.columns]
+    if missing_features:
+        raise ValueError(f"{patient_data_input} is missing the columns {missing_features}")
+    return df[list(features)].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
 
-    network = Network(
-        chain_id="nillion-chain-testnet-1",
-        chain_grpc_endpoint="https://testnet-nillion-grpc.lavenderfive.com",
-        nilvm_grpc_endpoint="https://node-1.nilvm-testnet-1.nillion-network.testnet.nillion.network:14311"
-    ) 
 
-    model_provider_name = "Provider"
-    model_provider = await new_client(
-        network,
-        0,
-        b'\xbf\xdf7\xa9\x1eL\x10i"\xd8\x1f\xbb\xe8\r;\x1b`\x1a\xd1\xa1;\xef\xd8\xbbf|\xf9\x12\xe9\xef\x03\xc7',
+def completed_rows(output_path):
+    """Rows already written to a cohort output file, dropping a line cut off by an interrupted run"""
+    if not os.path.exists(output_path):
+        return set()
+    with open(output_path, "rb+") as output_file:
+        content = output_file.read()
+        complete = content[:content.rfind(b"\n") + 1]
+        if len(complete) < len(content):
+            output_file.truncate(len(complete))
+    rows = set()
+    for line in complete.decode("utf-8").splitlines()[1:]:
+        rows.add(int(line.split(",", 1)[0]))
+    return rows
+
+
+async def secure_inference(patient, program_id, input_bindings, output_bindings, model_store_id,
+                           patient_data_scaled, verbose=False):
+    """Store one patient's scaled features as secrets, run the program on them and return its outputs"""
+    # 🔐 Store input as secret values
+    if verbose:
+        print("🔐 Storing patient data as secret values...")
+    patient_features = na_client.array(patient_data_scaled, "patient_data", na_client.SecretRational)
+
+    permissions = Permissions.defaults_for_user(patient.user_id).allow_compute(
+        patient.user_id, program_id
     )
+    patient_data_store_id = await patient.store_values(
+        patient_features, ttl_days=1, permissions=permissions
+    ).invoke()
+    if verbose:
+        print(f"✅ Patient data stored: {patient_data_store_id}")
+
+    # 🚀 Run computation
+    if verbose:
+        print("🚀 Running computation on program", program_id)
+    compute_id = await patient.compute(
+        program_id,
+        input_bindings,
+        output_bindings,
+        values={},
+        value_ids=[model_store_id, patient_data_store_id],
+    ).invoke()
+
+    if verbose:
+        print(f"⏳ Waiting for compute_id {compute_id} to complete...")
+    result = await patient.retrieve_compute_results(compute_id).invoke()
+    if verbose:
+        print(f"✅ Inference result for compute_id {compute_id}")
+        print(f"📦 Raw result: {result}")
+    return result
+
+
+async def score_cohort(compute, features_scaled, valid, output_path, log_scale,
+                       concurrency, max_attempts, retry_backoff):
+    """Run the secure pipeline for every patient not yet in output_path, appending each result as it arrives
+
+    `compute(patient_data_scaled)` returns a patient's fixed-point logit. At
+    most `concurrency` patients are in flight; a failed patient is retried
+    after retry_backoff * 2**attempt seconds (with jitter), without holding a
+    slot while it waits. Results are written in completion order with their
+    input row number, so a rerun skips the rows already written.
+    """
+    done = completed_rows(output_path)
+    pending = [row for row in range(len(features_scaled)) if row not in done]
+    print(f"🧮 {len(features_scaled)} patients, {len(done)} already scored, {len(pending)} to go "
+          f"({concurrency} at a time)")
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = {}
+    started = time.perf_counter()
+
+    with open(output_path, "a") as output_file:
+        if output_file.tell() == 0:
+            output_file.write(",".join(COHORT_COLUMNS) + "\n")
+
+        def write_result(row, logit_value):
+            if logit_value is None:
+                # Missing, non-numeric or negative features are never sent to the network
+                output_file.write(f"{row},,,\n")
+            else:
+                probability = float(decode_probability(logit_value, log_scale))
+                output_file.write(f"{row},{logit_value},{probability!r},{int(probability > 0.5)}\n")
+            output_file.flush()
+
+        async def score(row):
+            if not valid[row]:
+                write_result(row, None)
+                return
+            for attempt in range(max_attempts):
+                try:
+                    async with semaphore:
+                        logit_value = await compute(features_scaled[row])
+                except Exception as e:
+                    if attempt + 1 == max_attempts:
+                        failures[row] = e
+                        print(f"❌ Patient {row} failed after {max_attempts} attempts: {e}")
+                        return
+                    await asyncio.sleep(retry_backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+                else:
+                    write_result(row, logit_value)
+                    return
+
+        await asyncio.gather(*(score(row) for row in pending))
+
+    elapsed = time.perf_counter() - started
+    scored = len(pending) - len(failures)
+    print(f"✅ Scored {scored} patients in {elapsed:.1f}s ({scored / elapsed if elapsed else 0:.1f} patients/s); "
+          f"results in {output_path}")
+    if failures:
+        print(f"⚠️ {len(failures)} patients failed; rerun the same command to retry them")
+    return failures
+
+
+async def main(patient_data_input: str, in_path: str) -> None:
+    if ARGS.network == "local":
+        network = Network.from_env()
+    else:
+        network = Network(
+            chain_id="nillion-chain-testnet-1",
+            chain_grpc_endpoint="https://testnet-nillion-grpc.lavenderfive.com",
+            nilvm_grpc_endpoint="https://node-1.nilvm-testnet-1.nillion-network.testnet.nillion.network:14311"
+        )
+
+    model_provider_name = "Provider"
     patient_name = "Patient"
     patient = await new_client(
         network,
@@ -95,7 +264,7 @@ async def main(patient_data_input: str, in_path: str) -> None:
         b"\x15\xa0\xc1\xcc\x12\xb5r\xf9\xcb\x89\x95\x8d\x94\xfb\xfe)\xdf\xfe\xbd3\x00\x18\x80\xc1\xd9W\x8b\xf7\xc0\x92S\xe9",
     )
 
-    # 💸 Fund both clients
+    # 💸 Fund the client
    
 
     # 📥 Load model identifiers
@@ -106,48 +275,46 @@ async def main(patient_data_input: str, in_path: str) -> None:
     model_store_id = uuid.UUID(hex=provider_variables["model_store_id"])
     model_provider_user_id = UserId.parse(provider_variables["model_provider_user_id"])
 
-    # 🔄 Load patient data and scale
-    patient_data = load_patient_data(patient_data_input)
-    scaler = joblib.load("model/diabetes_scaler.joblib")
-    patient_data_scaled = scaler.transform([patient_data])[0]
-    print(f"🩺 Patient input (scaled): {patient_data_scaled}")
-
-    # 🔐 Store input as secret values
-    print("🔐 Storing patient data as secret values...")
-    patient_features = na_client.array(patient_data_scaled, "patient_data", na_client.SecretRational)
+    # 🎚️ Encode and decode with the precision the model was stored with
+    fixed_point = fixed_point_from_provider(provider_variables)
+    na.set_log_scale(fixed_point.log_scale)
 
-    permissions = Permissions.defaults_for_user(patient.user_id).allow_compute(
-        patient.user_id, program_id
-    )
-    patient_data_store_id = await patient.store_values(
-        patient_features, ttl_days=1, permissions=permissions
-    ).invoke()
-    print(f"✅ Patient data stored: {patient_data_store_id}")
-
-    # 🚀 Run computation
-    print("🚀 Running computation on program", program_id)
     input_bindings = [
         InputPartyBinding(model_provider_name, model_provider_user_id),
         InputPartyBinding(patient_name, patient.user_id),
     ]
     output_bindings = [OutputPartyBinding(patient_name, [patient.user_id])]
+    bundle = map_artifact("model/diabetes_model.bin")
 
-    compute_id = await patient.compute(
-        program_id,
-        input_bindings,
-        output_bindings,
-        values={},
-        value_ids=[model_store_id, patient_data_store_id],
-    ).invoke()
+    if ARGS.output_path:
+        # 👥 Cohort mode: every patient of the CSV through the same clients
+        features = load_cohort(patient_data_input, bundle.features)
+        valid = validate_features(features)
+        features_scaled = bundle.scaler.transform(features)
 
-    print(f"⏳ Waiting for compute_id {compute_id} to complete...")
-    result = await patient.retrieve_compute_results(compute_id).invoke()
-    print(f"✅ Inference result for compute_id {compute_id}")
-    print(f"📦 Raw result: {result}")
+        async def compute_logit(patient_data_scaled):
+            result = await secure_inference(
+                patient, program_id, input_bindings, output_bindings, model_store_id, patient_data_scaled
+            )
+            return result.get("diabetes_logit_0").value
+
+        return await score_cohort(
+            compute_logit, features_scaled, valid, ARGS.output_path, fixed_point.log_scale,
+            ARGS.concurrency, ARGS.max_attempts, ARGS.retry_backoff,
+        )
+
+    # 🔄 Load patient data and scale
+    patient_data = load_patient_data(patient_data_input, bundle.features)
+    patient_data_scaled = bundle.scaler.transform([patient_data])[0]
+    print(f"🩺 Patient input (scaled): {patient_data_scaled}")
+
+    result = await secure_inference(
+        patient, program_id, input_bindings, output_bindings, model_store_id, patient_data_scaled, verbose=True
+    )
 
     # 📊 Compute probability
     logit_value = result.get("diabetes_logit_0").value
-    probability = 1 / (1 + np.exp(-logit_value / 2**16))
+    probability = decode_probability(logit_value, fixed_point.log_scale)
     print(f"📊 Diabetes probability: {probability:.4f} ({probability*100:.2f}%)")
 
     if probability > 0.5:
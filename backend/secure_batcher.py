@@ -0,0 +1,83 @@
+"""Micro-batching of concurrent secure prediction requests"""
+
+import asyncio
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Collects concurrent predictions and scores them with one batched call
+
+    Requests are buffered until `max_batch_size` of them are waiting or
+    `max_wait` seconds have passed since the first one arrived, then handed to
+    `score_batch(features)` as one (N, DIM) matrix. An exception returned in
+    place of a probability fails only that caller. Up to `max_in_flight`
+    batches run at once, so the next batch is uploaded while the current one
+    is still being computed.
+    """
+
+    def __init__(self, score_batch, max_batch_size, max_wait, max_in_flight=2):
+        self.score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_in_flight = max_in_flight
+        self._pending = []
+        self._timer = None
+        self._in_flight = None
+        self._tasks = set()
+
+    async def submit(self, features):
+        """Queue one feature vector and wait for its probability"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((features, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._dispatch)
+
+        return await future
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch = self._pending[:self.max_batch_size]
+        self._pending = self._pending[self.max_batch_size:]
+        if not batch:
+            return
+
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        # Whatever did not fit waits for the next window
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._dispatch)
+
+    async def _run(self, batch):
+        if self._in_flight is None:
+            self._in_flight = asyncio.Semaphore(self.max_in_flight)
+
+        async with self._in_flight:
+            # Callers that gave up while queued are left out of the batch
+            batch = [(features, future) for features, future in batch if not future.done()]
+            if not batch:
+                return
+            try:
+                probabilities = await self.score_batch(np.array([features for features, _ in batch]))
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+        for (_, future), probability in zip(batch, probabilities):
+            if future.done():
+                continue
+            if isinstance(probability, BaseException):
+                future.set_exception(probability)
+            else:
+                future.set_result(probability)
@@ -6,12 +6,29 @@ This program enables private inference where:
 - The prediction is computed securely without revealing sensitive data
 """
 
+import os
+import sys
+
 import nada_numpy as na
 from nada_dsl import Party
 from nada_ai.linear_model import LogisticRegression
 
+# Fixed-point precision comes from the backend calibration (calibrate_fixed_point.py)
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+from fixed_point import FIXED_POINT_PATH, load_fixed_point, record_compiled_fixed_point
+
+# nada build compiles this file to target/<PROGRAM_NAME>.nada.bin
+PROGRAM_NAME = "diabetes_prediction"
+
 
 def nada_main():
+    # Encode SecretRationals with the calibrated number of fractional bits, and record
+    # them next to the compiled program so a model encoded differently is never stored for it
+    fixed_point = load_fixed_point(os.path.join(BACKEND_DIR, FIXED_POINT_PATH))
+    na.set_log_scale(fixed_point.log_scale)
+    record_compiled_fixed_point(os.path.join(BACKEND_DIR, "target", f"{PROGRAM_NAME}.nada.bin"), fixed_point)
+
     # Define the parties involved
     model_provider = Party(name="Provider")  # Provider of the trained model
     patient = Party(name="Patient")         # User with medical data
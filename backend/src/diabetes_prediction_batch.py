@@ -0,0 +1,53 @@
+"""
+Batched diabetes prediction using logistic regression in Nada.
+Same parties and model as diabetes_prediction.py, but the Patient provides a
+(BATCH_SIZE, DIM) matrix and receives one logit per row, so a single
+computation scores a whole batch of patients.
+"""
+
+import os
+import sys
+
+import numpy as np
+import nada_numpy as na
+from nada_dsl import Party
+from nada_ai.linear_model import LogisticRegression
+
+# Batch shape and fixed-point precision come from the backend build configuration
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+from config import BATCH_SIZE, DIM
+from fixed_point import FIXED_POINT_PATH, load_fixed_point, record_compiled_fixed_point
+
+# nada build compiles this file to target/<PROGRAM_NAME>.nada.bin
+PROGRAM_NAME = "diabetes_prediction_batch"
+
+
+def nada_main():
+    # Encode SecretRationals with the calibrated number of fractional bits, and record
+    # them next to the compiled program so a model encoded differently is never stored for it
+    fixed_point = load_fixed_point(os.path.join(BACKEND_DIR, FIXED_POINT_PATH))
+    na.set_log_scale(fixed_point.log_scale)
+    record_compiled_fixed_point(os.path.join(BACKEND_DIR, "target", f"{PROGRAM_NAME}.nada.bin"), fixed_point)
+
+    # Define the parties involved
+    model_provider = Party(name="Provider")  # Provider of the trained model
+    patient = Party(name="Patient")         # User with medical data
+    
+    # Instantiate logistic regression for diabetes prediction
+    diabetes_model = LogisticRegression(DIM, 1)
+    
+    # Load model weights from Nillion network
+    # The model was previously stored with the ID "diabetes_model"
+    diabetes_model.load_state_from_network("diabetes_model", model_provider, na.SecretRational)
+    
+    # Load the patients' medical data, one row per patient
+    # Unused rows of a partially filled batch are zero padded by the client
+    patient_data = na.array((BATCH_SIZE, DIM), patient, "patient_data", na.SecretRational)
+    
+    # Score every row against the same model weights
+    logits = [diabetes_model.forward(patient_data[i])[0] for i in range(BATCH_SIZE)]
+    result = na.NadaArray(np.array(logits))
+    
+    # Output one score per patient as diabetes_logit_0 ... diabetes_logit_{BATCH_SIZE - 1}
+    return result.output(patient, "diabetes_logit")
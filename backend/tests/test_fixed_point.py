@@ -0,0 +1,30 @@
+"""The fixed-point setting recorded next to compiled Nada programs"""
+
+import pytest
+
+from fixed_point import (DEFAULT_FIXED_POINT, FixedPoint, check_compiled_fixed_point, compiled_fixed_point_path,
+                         load_compiled_fixed_point, record_compiled_fixed_point)
+
+
+def test_record_is_written_next_to_the_program(tmp_path):
+    program = str(tmp_path / "target" / "diabetes_prediction.nada.bin")
+    record_compiled_fixed_point(program, FixedPoint(12, 64))
+    assert compiled_fixed_point_path(program) == str(tmp_path / "target" / "diabetes_prediction.fixed_point.json")
+    assert load_compiled_fixed_point(program) == FixedPoint(12, 64)
+
+
+def test_programs_built_without_a_record_used_the_default(tmp_path):
+    assert load_compiled_fixed_point(str(tmp_path / "diabetes_prediction.nada.bin")) == DEFAULT_FIXED_POINT
+
+
+def test_matching_scale_is_accepted(tmp_path):
+    program = str(tmp_path / "diabetes_prediction.nada.bin")
+    record_compiled_fixed_point(program, FixedPoint(12, 128))
+    check_compiled_fixed_point(program, FixedPoint(12, 128))
+
+
+def test_mismatched_scale_is_refused(tmp_path):
+    program = str(tmp_path / "diabetes_prediction.nada.bin")
+    record_compiled_fixed_point(program, FixedPoint(16, 128))
+    with pytest.raises(ValueError, match="compiled with log_scale 16"):
+        check_compiled_fixed_point(program, FixedPoint(12, 128))
@@ -0,0 +1,91 @@
+"""Parity of the fused kernel with the scikit-learn scaler + model pipeline"""
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+from config import DIM
+from fixed_point import FixedPoint
+from fused_kernel import FusedKernel, sigmoid
+from model_artifact import map_artifact, write_artifact
+
+
+@pytest.fixture(scope="module")
+def pipeline():
+    """A scaler and model fitted on random, differently scaled features"""
+    rng = np.random.default_rng(0)
+    features = rng.normal(loc=rng.uniform(0, 100, DIM), scale=rng.uniform(0.5, 30, DIM), size=(500, DIM))
+    scaler = StandardScaler().fit(features)
+    logits = scaler.transform(features) @ rng.normal(size=DIM)
+    labels = (rng.random(len(features)) < sigmoid(logits)).astype(int)
+    model = LogisticRegression(solver="liblinear", random_state=42).fit(scaler.transform(features), labels)
+    return model, scaler, features
+
+
+def edge_cases(features):
+    """Zeros, the training mean, very large and very small values, and random rows far outside the data"""
+    rng = np.random.default_rng(1)
+    return np.vstack([
+        np.zeros(DIM),
+        features.mean(axis=0),
+        np.full(DIM, 1e6),
+        np.full(DIM, -1e6),
+        np.full(DIM, 1e-12),
+        rng.uniform(-1e4, 1e4, size=(100, DIM)),
+    ])
+
+
+def sklearn_scores(model, scaler, features):
+    scaled = scaler.transform(features)
+    return model.decision_function(scaled), model.predict_proba(scaled)[:, 1]
+
+
+def assert_parity(kernel, model, scaler, features):
+    logits, probabilities = sklearn_scores(model, scaler, features)
+    np.testing.assert_allclose(kernel.decision_function(features), logits, rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(kernel.predict_proba(features), probabilities, rtol=0, atol=1e-12)
+
+
+def test_matches_sklearn_on_training_rows(pipeline):
+    model, scaler, features = pipeline
+    assert_parity(FusedKernel.from_model(model, scaler), model, scaler, features)
+
+
+def test_matches_sklearn_on_edge_cases(pipeline):
+    model, scaler, features = pipeline
+    assert_parity(FusedKernel.from_model(model, scaler), model, scaler, edge_cases(features))
+
+
+def test_single_row_matches_matrix_row(pipeline):
+    model, scaler, features = pipeline
+    kernel = FusedKernel.from_model(model, scaler)
+    assert kernel.predict_proba(features[3]) == pytest.approx(kernel.predict_proba(features)[3], abs=1e-15)
+
+
+def test_mapped_bundle_matches_sklearn(pipeline, tmp_path):
+    """The kernel and estimators read back from a memory-mapped bundle score like the fitted pipeline"""
+    model, scaler, features = pipeline
+    path = tmp_path / "diabetes_model.bin"
+    with open(path, "wb") as artifact_file:
+        write_artifact(artifact_file, 1, model, scaler, fixed_point=FixedPoint(16, 128))
+
+    bundle = map_artifact(str(path))
+    samples = np.vstack([features, edge_cases(features)])
+    assert_parity(bundle.kernel, model, scaler, samples)
+    assert bundle.kernel.check_parity(model, scaler, samples) <= 1e-12
+    assert_parity(bundle.kernel, bundle.model.to_estimator(), bundle.scaler.to_estimator(), samples)
+
+
+def test_check_parity_rejects_a_wrong_kernel(pipeline):
+    model, scaler, features = pipeline
+    kernel = FusedKernel.from_model(model, scaler)
+    wrong = FusedKernel(kernel.packed + np.append(np.zeros(DIM), 0.1))
+    with pytest.raises(ValueError):
+        wrong.check_parity(model, scaler, features)
+
+
+def test_sigmoid_saturates_without_overflow():
+    with np.errstate(over="raise"):
+        probabilities = sigmoid(np.array([-1e4, -50.0, 0.0, 50.0, 1e4]))
+    np.testing.assert_allclose(probabilities, [0.0, 0.0, 0.5, 1.0, 1.0], rtol=0, atol=1e-15)
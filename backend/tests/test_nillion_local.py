@@ -0,0 +1,29 @@
+"""The local Nillion stand-in computes logits like nada_numpy and the calibration simulation"""
+
+import numpy as np
+
+from config import DIM
+from fixed_point import encode, simulate_logits
+from nillion_local import _forward
+
+
+def stored_values(coef, intercept, patient, log_scale):
+    """Secrets as the model provider and a patient store them, named like na_client.array"""
+    values = {f"diabetes_model_coef_0_{i}": int(value) for i, value in enumerate(encode(coef, log_scale))}
+    values["diabetes_model_intercept_0"] = int(encode([intercept], log_scale)[0])
+    values.update({f"patient_data_{i}": int(value) for i, value in enumerate(encode(patient, log_scale))})
+    return values
+
+
+def test_forward_truncates_each_product_like_the_calibration_simulation():
+    rng = np.random.default_rng(0)
+    for log_scale in (8, 12, 16):
+        coef = rng.normal(size=DIM)
+        intercept = rng.normal()
+        patient = rng.normal(size=DIM)
+
+        logit = _forward(stored_values(coef, intercept, patient, log_scale), log_scale,
+                         np.random.default_rng(7))["diabetes_logit_0"].value
+        expected, _ = simulate_logits(patient.reshape(1, -1), coef, [intercept], log_scale, seed=7)
+        assert logit == expected[0]
+
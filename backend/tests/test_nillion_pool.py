@@ -0,0 +1,175 @@
+"""NillionClientPool with a fake client factory: acquire, release and health-check replacement"""
+
+import asyncio
+import itertools
+
+import pytest
+
+from nillion_pool import NillionClientPool
+
+
+class FakeClient:
+    def __init__(self, party, number):
+        self.party = party
+        self.number = number
+        self.healthy = True
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeNetwork:
+    """Client factory and health check that record every call"""
+
+    def __init__(self):
+        self.created = []
+        self.checked = []
+        self._numbers = itertools.count()
+
+    async def client_factory(self, party):
+        client = FakeClient(party, next(self._numbers))
+        self.created.append(client)
+        return client
+
+    async def health_check(self, client):
+        self.checked.append(client)
+        if client.healthy is None:
+            raise ConnectionError("session dropped")
+        return client.healthy
+
+
+def make_pool(network, **options):
+    return NillionClientPool(
+        network.client_factory, ["Provider", "Patient"], health_check=network.health_check, **options
+    )
+
+
+async def borrow(pool, party):
+    async with pool.session(party) as client:
+        return client
+
+
+def test_sessions_are_created_lazily_and_reused():
+    async def scenario():
+        network = FakeNetwork()
+        pool = make_pool(network)
+        first = await borrow(pool, "Patient")
+        second = await borrow(pool, "Patient")
+        provider = await borrow(pool, "Provider")
+        return network, first, second, provider
+
+    network, first, second, provider = asyncio.run(scenario())
+    assert first is second
+    assert provider is not first and provider.party == "Provider"
+    assert len(network.created) == 2
+    # Released within the interval, so the sessions were never checked
+    assert network.checked == []
+
+
+def test_start_warms_every_slot():
+    async def scenario():
+        network = FakeNetwork()
+        pool = make_pool(network, size=3)
+        await pool.start()
+        await borrow(pool, "Patient")
+        return network
+
+    network = asyncio.run(scenario())
+    assert sorted(client.party for client in network.created) == ["Patient"] * 3 + ["Provider"] * 3
+
+
+def test_size_bounds_concurrent_sessions():
+    async def scenario():
+        network = FakeNetwork()
+        pool = make_pool(network, size=2)
+        in_use = peak = 0
+        held = []
+
+        async def hold():
+            nonlocal in_use, peak
+            async with pool.session("Patient") as client:
+                in_use += 1
+                peak = max(peak, in_use)
+                held.append(client)
+                await asyncio.sleep(0.01)
+                in_use -= 1
+
+        await asyncio.gather(*(hold() for _ in range(6)))
+        return network, peak, held
+
+    network, peak, held = asyncio.run(scenario())
+    assert peak == 2
+    assert len(network.created) == 2
+    assert set(map(id, held)) == set(map(id, network.created))
+
+
+def test_failed_request_triggers_a_health_check_and_keeps_a_healthy_client():
+    async def scenario():
+        network = FakeNetwork()
+        pool = make_pool(network)
+        with pytest.raises(RuntimeError):
+            async with pool.session("Patient"):
+                raise RuntimeError("compute failed")
+        client = await borrow(pool, "Patient")
+        again = await borrow(pool, "Patient")
+        return network, client, again
+
+    network, client, again = asyncio.run(scenario())
+    assert client is again is network.created[0]
+    # Checked once after the failure, then trusted again
+    assert network.checked == [client]
+
+
+@pytest.mark.parametrize("healthy", [False, None], ids=["check returns False", "check raises"])
+def test_unhealthy_client_is_replaced(healthy):
+    async def scenario():
+        network = FakeNetwork()
+        pool = make_pool(network)
+        with pytest.raises(RuntimeError):
+            async with pool.session("Patient") as client:
+                client.healthy = healthy
+                raise RuntimeError("compute failed")
+        replacement = await borrow(pool, "Patient")
+        return network, replacement
+
+    network, replacement = asyncio.run(scenario())
+    assert len(network.created) == 2
+    assert replacement is network.created[1]
+
+
+def test_idle_sessions_are_checked_before_reuse():
+    async def scenario():
+        network = FakeNetwork()
+        pool = make_pool(network, health_check_interval=0)
+        first = await borrow(pool, "Patient")
+        first.healthy = False
+        second = await borrow(pool, "Patient")
+        return network, first, second
+
+    network, first, second = asyncio.run(scenario())
+    assert network.checked == [first]
+    assert second is not first
+
+
+def test_close_drops_sessions():
+    async def scenario():
+        network = FakeNetwork()
+        pool = make_pool(network)
+        first = await borrow(pool, "Patient")
+        await pool.close()
+        second = await borrow(pool, "Patient")
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first.closed
+    assert second is not first and not second.closed
+
+
+def test_unknown_party_is_rejected():
+    async def scenario():
+        async with make_pool(FakeNetwork()).session("Auditor"):
+            pass
+
+    with pytest.raises(KeyError):
+        asyncio.run(scenario())
@@ -0,0 +1,91 @@
+"""Secure /predict/batch when patients are scored one computation each and one of them fails"""
+
+import asyncio
+import io
+import os
+import shutil
+
+import httpx
+import numpy as np
+import pytest
+
+from columnar_io import NPY_MEDIA_TYPE, write_npy
+from fixed_point import FixedPoint
+from nillion_pool import ProviderInfo
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAILING_GLUCOSE = 123.0
+
+
+@pytest.fixture(scope="module")
+def app_module(tmp_path_factory):
+    """app imported in a scratch directory holding a copy of the shipped model bundle"""
+    work_dir = tmp_path_factory.mktemp("backend")
+    os.makedirs(work_dir / "model")
+    shutil.copy(os.path.join(BACKEND_DIR, "model", "diabetes_model.bin"), work_dir / "model")
+    previous_dir = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        import app
+        yield app
+    finally:
+        os.chdir(previous_dir)
+
+
+@pytest.fixture
+def per_patient_fallback(app_module, monkeypatch):
+    """No batched program deployed; the patient with FAILING_GLUCOSE fails its computation"""
+    info = ProviderInfo("program", None, "provider", None, FixedPoint(16, 128))
+    monkeypatch.setattr(app_module.provider_info, "get", lambda: info)
+    monkeypatch.setattr(app_module, "get_nillion_imports", lambda: (None,) * 14)
+    snapshot = app_module.model_registry.current()
+
+    async def predict_diabetes(patient_data):
+        await asyncio.sleep(0)
+        if patient_data[1] == FAILING_GLUCOSE:
+            raise RuntimeError("injected compute failure")
+        return float(snapshot.kernel.predict_proba(patient_data))
+
+    monkeypatch.setattr(app_module, "predict_diabetes", predict_diabetes)
+    return snapshot
+
+
+def post(app_module, path, **kwargs):
+    async def request():
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(path, **kwargs)
+    return asyncio.run(request())
+
+
+def test_npy_batch_reports_a_failed_patient_as_nan(app_module, per_patient_fallback):
+    patients = np.array([
+        [1, 85, 66, 29, 0, 26.6, 0.351, 31],
+        [1, FAILING_GLUCOSE, 66, 29, 0, 26.6, 0.351, 31],
+        [1, -85, 66, 29, 0, 26.6, 0.351, 31],
+        [6, 148, 72, 35, 0, 33.6, 0.627, 50],
+    ], dtype=np.float64)
+
+    response = post(
+        app_module, "/predict/batch?use_local=false",
+        content=write_npy(patients), headers={"content-type": NPY_MEDIA_TYPE},
+    )
+
+    assert response.status_code == 200
+    # The failed patient and the negative row are both counted
+    assert response.headers["X-Invalid-Rows"] == "2"
+    probabilities = np.load(io.BytesIO(response.content))
+    assert np.isnan(probabilities[[1, 2]]).all()
+    expected = per_patient_fallback.kernel.predict_proba(patients[[0, 3]])
+    np.testing.assert_allclose(probabilities[[0, 3]], expected)
+
+
+def test_json_batch_reports_a_failed_patient_on_its_row(app_module, per_patient_fallback):
+    rows = [[1, 85, 66, 29, 0, 26.6, 0.351, 31], [1, FAILING_GLUCOSE, 66, 29, 0, 26.6, 0.351, 31]]
+
+    response = post(app_module, "/predict/batch?use_local=false", json=rows)
+
+    assert response.status_code == 200
+    results = response.text.splitlines()
+    assert '"diabetes_probability"' in results[0]
+    assert results[1] == '{"row": 1, "error": "injected compute failure"}'
@@ -5,9 +5,6 @@ import asyncio
 import json
 import os
 
-import joblib
-import numpy as np
-import pandas as pd
 from sklearn.linear_model import LogisticRegression
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
@@ -16,12 +13,16 @@ from sklearn.metrics import accuracy_score
 import nada_numpy as na
 import nada_numpy.client as na_client
 from dotenv import load_dotenv
-from nillion_client import (InputPartyBinding, Network, NilChainPayer,
-                          NilChainPrivateKey, OutputPartyBinding,
-                          Permissions, PrivateKey, SecretInteger, VmClient)
+from nillion_client import (Network, NilChainPayer, NilChainPrivateKey,
+                          Permissions, PrivateKey, VmClient)
 
 from nada_ai.client import SklearnClient
 
+from dataset import load_training_dataset
+from fixed_point import check_compiled_fixed_point
+from fused_kernel import FusedKernel
+from model_registry import ModelRegistry
+
 PARSER = argparse.ArgumentParser()
 PARSER.add_argument(
     "--out-path",
@@ -29,24 +30,25 @@ PARSER.add_argument(
     type=str,
     required=True,
 )
+PARSER.add_argument(
+    "--network",
+    dest="network",
+    choices=["testnet", "local"],
+    default=os.getenv("NILLION_NETWORK", "testnet"),
+    help="Nillion testnet, or the in-process stand-in (set NILLION_LOCAL_STATE to share it between scripts)",
+)
 ARGS = PARSER.parse_args()
 
+if ARGS.network == "local":
+    from nillion_local import LocalNetwork as Network, LocalVmClient as VmClient
+
 home = os.getenv("HOME")
 load_dotenv("nillion.env")
 
-# Function to download and prepare the diabetes dataset
+# Function to load and prepare the diabetes dataset
 def prepare_diabetes_data():
-    # Using the Pima Indians Diabetes dataset
-    url = "https://raw.githubusercontent.com/jbrownlee/Datasets/master/pima-indians-diabetes.data.csv"
-    column_names = ['Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness', 
-                   'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age', 'Outcome']
-    
-    # Load the dataset
-    df = pd.read_csv(url, names=column_names)
-    
-    # Split features and target
-    X = df.drop('Outcome', axis=1)
-    y = df['Outcome']
+    # Using the Pima Indians Diabetes dataset from the local cache
+    X, y = load_training_dataset()
     
     # Split the data into training and testing sets
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
@@ -71,22 +73,24 @@ def train_diabetes_model():
     accuracy = accuracy_score(y_test, y_pred)
     print(f"Model accuracy: {accuracy:.4f}")
     
-    # Save the model and scaler
-    if not os.path.exists("model"):
-        os.makedirs("model")
-    joblib.dump(model, "model/diabetes_classifier.joblib")
-    joblib.dump(scaler, "model/diabetes_scaler.joblib")
-    
-    return model, scaler
+    # Export the fused scaler + model kernel used for fast local scoring
+    kernel = FusedKernel.from_model(model, scaler)
+    kernel.check_parity(model, scaler, scaler.inverse_transform(X_test))
+
+    # Save the model bundle every entry point (and a running API) reads
+    return ModelRegistry("model/diabetes_model.bin").publish(model, scaler, kernel)
 
 async def new_client(network, id: int, private_key: str = None):
     # Create payments config and set up Nillion wallet with a private key to pay for operations
-    nilchain_key: str = os.getenv(f"NILLION_NILCHAIN_PRIVATE_KEY_{id}")  # type: ignore
-    payer = NilChainPayer(
-        network,
-        wallet_private_key=NilChainPrivateKey(bytes.fromhex(nilchain_key)),
-        gas_limit=10000000,
-    )
+    # (the local stand-in does not charge for them)
+    payer = None
+    if ARGS.network != "local":
+        nilchain_key: str = os.getenv(f"NILLION_NILCHAIN_PRIVATE_KEY_{id}")  # type: ignore
+        payer = NilChainPayer(
+            network,
+            wallet_private_key=NilChainPrivateKey(bytes.fromhex(nilchain_key)),
+            gas_limit=10000000,
+        )
 
     # Use a random key to identify ourselves
     signing_key = PrivateKey(private_key)
@@ -96,16 +100,18 @@ async def new_client(network, id: int, private_key: str = None):
 
 async def main(out_path: str):
     # Train the diabetes prediction model
-    model, scaler = train_diabetes_model()
+    bundle = train_diabetes_model()
     print("Diabetes prediction model trained successfully.")
     
     # Connect to the Nillion network
-    network = Network.from_config("devnet")
-    network = Network(
-        chain_id="nillion-chain-testnet-1",
-        chain_grpc_endpoint="https://testnet-nillion-grpc.lavenderfive.com",
-        nilvm_grpc_endpoint="https://node-1.nilvm-testnet-1.nillion-network.testnet.nillion.network:14311"
-    ) 
+    if ARGS.network == "local":
+        network = Network.from_env()
+    else:
+        network = Network(
+            chain_id="nillion-chain-testnet-1",
+            chain_grpc_endpoint="https://testnet-nillion-grpc.lavenderfive.com",
+            nilvm_grpc_endpoint="https://node-1.nilvm-testnet-1.nillion-network.testnet.nillion.network:14311"
+        )
 
     # Create clients for model provider and patient
     model_provider = await new_client(
@@ -132,7 +138,14 @@ async def main(out_path: str):
 
     # Store the model as secrets
     print("-----STORE SECRETS (MODEL)")
-    model_client = SklearnClient(model)
+    # Encode in the precision recorded in the bundle (calibrate_fixed_point.py), which
+    # has to be the one the program was compiled with
+    fixed_point = bundle.fixed_point
+    check_compiled_fixed_point(
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), program_mir_path), fixed_point
+    )
+    na.set_log_scale(fixed_point.log_scale)
+    model_client = SklearnClient(bundle.model.to_estimator())
     model_secrets = model_client.export_state_as_secrets(
         "diabetes_model", na_client.SecretRational
     )
@@ -157,6 +170,7 @@ async def main(out_path: str):
             "program_id": str(program_id),
             "model_store_id": model_store_id.hex,
             "model_provider_user_id": str(model_provider.user_id),
+            "fixed_point": fixed_point._asdict(),
         }
         json.dump(provider_variables, provider_variables_file)
     
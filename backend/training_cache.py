@@ -0,0 +1,129 @@
+"""Memoized training results keyed by the training data and configuration
+
+A full or cross-validated fit is a pure function of the base dataset, the
+uploaded rows and the training settings, so its result is saved under the
+SHA-256 of all three: the model bundle, the holdout accuracy and, once
+uploaded, the Nillion store ids. A repeat request publishes the saved
+bundle instead of refitting the model, and the Nillion upload is
+skipped while the recorded store is still alive. Incremental training depends
+on every batch trained on before, so it is never memoized.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from importlib.metadata import PackageNotFoundError, version
+
+from model_registry import atomic_save_artifact, atomic_write_json
+from upload_store import file_sha256
+
+# dataset.BASE_DATASET_CSV, named here so the web workers need not import pandas
+BASE_DATASET_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "diabetes.csv")
+TRAINING_CACHE_DIR = "model/training_cache"
+TRAINING_CACHE_ENTRIES = int(os.getenv("TRAINING_CACHE_ENTRIES", "32"))
+MEMOIZED_MODES = ("full", "cv")
+# Bump when a trainer changes in a way its settings below do not capture
+TRAINING_CACHE_VERSION = 1
+# Settings read by the trainers at fit time, per mode
+MODE_SETTINGS = {
+    "full": (),
+    "cv": ("CV_GRID", "CV_FOLDS", "CV_PRUNE_MARGIN"),
+}
+
+
+def _sklearn_version():
+    try:
+        return version("scikit-learn")
+    except PackageNotFoundError:
+        return None
+
+
+class TrainingResultCache:
+    """One directory per training key holding the model bundle and result.json
+
+    result.json is written last, so an entry without it is incomplete and
+    ignored. Only the TRAINING_CACHE_ENTRIES most recent entries are kept.
+    """
+
+    def __init__(self, directory, max_entries=None):
+        self.directory = directory
+        self.max_entries = TRAINING_CACHE_ENTRIES if max_entries is None else max_entries
+        self._lock = threading.Lock()
+        self._base_digest = None
+        self._base_stamp = None
+
+    def key(self, mode, dataset_digest):
+        """Training key for a job, or None if the mode is not memoized or its upload is gone"""
+        if mode not in MEMOIZED_MODES or dataset_digest is None:
+            return None
+        description = {
+            "version": TRAINING_CACHE_VERSION,
+            "mode": mode,
+            "base_dataset": self._base_dataset_digest(),
+            "dataset": dataset_digest,
+            "settings": {name: os.getenv(name) for name in MODE_SETTINGS[mode]},
+            "scikit-learn": _sklearn_version(),
+        }
+        return hashlib.sha256(json.dumps(description, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def artifact_path(self, key):
+        """Model bundle of an entry"""
+        return os.path.join(self.directory, key, "diabetes_model.bin")
+
+    def get(self, key):
+        """The recorded result for a key, or None on a miss"""
+        if key is None:
+            return None
+        path = self._result_path(key)
+        if not (os.path.exists(path) and os.path.exists(self.artifact_path(key))):
+            return None
+        with open(path, "r") as result_file:
+            return json.load(result_file)
+
+    def put(self, key, mode, model, scaler, kernel, accuracy):
+        """Save a freshly fitted model under its key"""
+        atomic_save_artifact(self.artifact_path(key), 0, model, scaler, kernel)
+        result = {
+            "key": key,
+            "mode": mode,
+            "accuracy": float(accuracy),
+            "provider_variables": None,
+            "created_at": time.time(),
+        }
+        atomic_write_json(result, self._result_path(key))
+        self._evict()
+        return result
+
+    def record_upload(self, key, provider_variables):
+        """Remember the Nillion store that holds an entry's model"""
+        with self._lock:
+            result = self.get(key)
+            if result is not None:
+                result["provider_variables"] = provider_variables
+                atomic_write_json(result, self._result_path(key))
+
+    def _result_path(self, key):
+        return os.path.join(self.directory, key, "result.json")
+
+    def _base_dataset_digest(self):
+        """Digest of the base CSV, rehashed only when the file changes"""
+        stat = os.stat(BASE_DATASET_CSV)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp != self._base_stamp:
+            self._base_digest = file_sha256(BASE_DATASET_CSV)
+            self._base_stamp = stamp
+        return self._base_digest
+
+    def _evict(self):
+        """Drop the oldest entries beyond max_entries"""
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                path = self._result_path(name)
+                if os.path.exists(path):
+                    entries.append((os.path.getmtime(path), name))
+            for _, name in sorted(entries)[:max(0, len(entries) - self.max_entries)]:
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
@@ -0,0 +1,94 @@
+"""Persistent status records for background training jobs"""
+
+import json
+import os
+import threading
+import time
+import uuid
+
+from model_registry import atomic_write_json
+
+# Job lifecycle; "completed" and "failed" are terminal
+QUEUED = "queued"
+TRAINING = "training"
+UPLOADING = "uploading"
+COMPLETED = "completed"
+FAILED = "failed"
+TERMINAL_STATUSES = (COMPLETED, FAILED)
+
+
+class TrainingJobStore:
+    """One JSON file per job, so status survives worker restarts
+
+    Every record carries the pid of the worker running it; a job whose worker
+    is gone was interrupted and can be picked up again by another worker.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, job_id):
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def create(self, data_path, mode="full"):
+        """Record a new queued job for an uploaded dataset"""
+        now = time.time()
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "status": QUEUED,
+            "mode": mode,
+            "data_path": data_path,
+            "accuracy": None,
+            "model_stored": False,
+            "upload_status": "pending",
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+            "pid": os.getpid(),
+        }
+        atomic_write_json(job, self._path(job["job_id"]))
+        return job
+
+    def get(self, job_id):
+        """Return a job record, or None if the id is unknown"""
+        # Job ids are generated hex strings; anything else cannot name a job file
+        if not job_id.isalnum():
+            return None
+        path = self._path(job_id)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as job_file:
+            return json.load(job_file)
+
+    def update(self, job_id, **fields):
+        """Merge fields into a job record and stamp it with this worker's pid"""
+        with self._lock:
+            job = self.get(job_id)
+            job.update(fields, updated_at=time.time(), pid=os.getpid())
+            atomic_write_json(job, self._path(job_id))
+            return job
+
+    def interrupted(self):
+        """Unfinished jobs whose worker process no longer exists"""
+        jobs = []
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".json"):
+                continue
+            job = self.get(name[:-len(".json")])
+            if job and job["status"] not in TERMINAL_STATUSES and not _pid_alive(job["pid"]):
+                jobs.append(job)
+        return jobs
+
+
+def _pid_alive(pid):
+    if pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
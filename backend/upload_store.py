@@ -0,0 +1,119 @@
+"""Content-addressed store for uploaded training CSVs
+
+Every upload is saved as uploads/<sha256>.csv, hashed while it streams to
+disk, so byte-identical uploads share one file (and the float32 row file
+ingested from it) whatever the client called them. A small manifest next to
+it, <sha256>.json, records the size and the client filenames seen.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+from model_registry import atomic_write_json
+
+HASH_CHUNK_BYTES = 1024 * 1024
+_DIGEST = re.compile(r"^[0-9a-f]{64}$")
+
+
+def file_sha256(path):
+    """Hex SHA-256 of a file's contents, read a chunk at a time"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as data_file:
+        while chunk := data_file.read(HASH_CHUNK_BYTES):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PendingUpload:
+    """An upload being written to a temporary file and hashed as it arrives"""
+
+    def __init__(self, directory):
+        fd, self.tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".csv")
+        self._file = os.fdopen(fd, "wb")
+        self._digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, chunk):
+        self._file.write(chunk)
+        self._digest.update(chunk)
+        self.size += len(chunk)
+
+    def close(self):
+        """Flush the data to disk and return its hex digest"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        return self._digest.hexdigest()
+
+    def discard(self):
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+class UploadStore:
+    """uploads/<sha256>.csv files with a manifest per distinct content"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def begin(self):
+        """Start receiving an upload; pass it to commit() once every chunk is written"""
+        return PendingUpload(self.directory)
+
+    def commit(self, upload, filename):
+        """Move a received upload to its content address and return (digest, path)
+
+        If the same bytes were uploaded before, the new copy is dropped and the
+        existing file (and its ingested rows) is reused.
+        """
+        try:
+            digest = upload.close()
+            path = self.path(digest)
+            if os.path.exists(path):
+                upload.discard()
+            else:
+                os.replace(upload.tmp_path, path)
+        except BaseException:
+            upload.discard()
+            raise
+        self._record(digest, upload.size, filename)
+        return digest, path
+
+    def path(self, digest):
+        return os.path.join(self.directory, f"{digest}.csv")
+
+    def manifest(self, digest):
+        """The manifest of a stored upload, or None if the digest is unknown"""
+        path = os.path.join(self.directory, f"{digest}.json")
+        if not _DIGEST.match(digest) or not os.path.exists(path):
+            return None
+        with open(path, "r") as manifest_file:
+            return json.load(manifest_file)
+
+    def digest_of(self, path):
+        """Digest of an upload path (None if it is gone); files stored before content addressing are hashed"""
+        if not os.path.exists(path):
+            return None
+        name = os.path.splitext(os.path.basename(path))[0]
+        return name if _DIGEST.match(name) else file_sha256(path)
+
+    def _record(self, digest, size, filename):
+        with self._lock:
+            now = time.time()
+            manifest = self.manifest(digest) or {
+                "sha256": digest, "size": size, "filenames": [], "uploads": 0, "first_seen": now,
+            }
+            if filename and filename not in manifest["filenames"]:
+                manifest["filenames"].append(filename)
+            manifest["uploads"] += 1
+            manifest["last_seen"] = now
+            atomic_write_json(manifest, os.path.join(self.directory, f"{digest}.json"))
@@ -37,6 +37,17 @@ interface TrainingResponse {
   model_stored?: boolean;
 }
 
+interface TrainingJob {
+  job_id: string;
+  status: string;
+  accuracy?: number | null;
+  model_stored?: boolean;
+  upload_status?: string;
+  error?: string | null;
+}
+
+const API_URL = 'https://fast-api-zerotrace-production.up.railway.app';
+
 interface DatasetStats {
   totalRecords: number;
   features: string[];
@@ -85,9 +96,9 @@ export default function DataContribution() {
     formData.append('file', file);
 
     try {
-      // Send to API
-      const response = await axios.post<TrainingResponse>(
-        'https://fast-api-zerotrace-production.up.railway.app/train', 
+      // Send to API; training runs as a background job
+      const response = await axios.post<TrainingJob>(
+        `${API_URL}/train`, 
         formData, 
         {
           headers: {
@@ -96,12 +107,23 @@ export default function DataContribution() {
         }
       );
       
+      // Poll the job until the model is trained
+      let job = response.data;
+      while (job.status === 'queued' || job.status === 'training') {
+        await new Promise((resolve) => setTimeout(resolve, 2000));
+        job = (await axios.get<TrainingJob>(`${API_URL}/train/${job.job_id}`)).data;
+      }
+      if (job.status === 'failed') {
+        setUploadError(job.error || 'Training failed. Please check your data and try again.');
+        return;
+      }
+      
       // Handle successful response
       setUploadResult({
-        message: response.data.message || 'Model trained successfully!',
-        accuracy: response.data.accuracy || 0.85, // Fallback if API doesn't return accuracy
-        model_id: response.data.model_id || 'diabetesPredictorV1',
-        model_stored: response.data.model_stored
+        message: 'Model trained successfully!',
+        accuracy: job.accuracy || 0.85, // Fallback if API doesn't return accuracy
+        model_id: job.job_id || 'diabetesPredictorV1',
+        model_stored: job.model_stored
       });
       
       // Sample dataset statistics (in a real app, this would come from the API)